@@ -0,0 +1,250 @@
+"""
+AsyncSession counterparts of the crud.py functions used on async code paths
+(chat, resume upload/ingestion, roadmap, analytics, careers). Sync routers keep
+using crud.py. Relationships that callers read are eager-loaded, since lazy
+loads are not allowed on an AsyncSession.
+"""
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from . import models, schemas
+from datetime import datetime
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+async def get_chat_session(db: AsyncSession, session_id: int):
+    return await db.get(models.ChatSession, session_id)
+
+async def get_chat_sessions(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(models.ChatSession).where(
+            models.ChatSession.user_id == user_id
+        ).order_by(models.ChatSession.session_number.asc())
+    )
+    return result.scalars().all()
+
+async def update_chat_session(db: AsyncSession, session_id: int, resume_id: int = None, summary: str = None):
+    session = await db.get(models.ChatSession, session_id)
+    if session:
+        if resume_id:
+            session.resume_id = resume_id
+        if summary:
+            session.summary = summary
+        await db.commit()
+        await db.refresh(session)
+    return session
+
+async def create_chat_message(db: AsyncSession, message: schemas.ChatMessageCreate):
+    db_message = models.ChatMessage(**message.dict())
+    db.add(db_message)
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
+async def get_unsummarized_chat_messages(db: AsyncSession, session_id: int, after_id: int = None,
+                                         before_id: int = None, limit: int = None):
+    """Messages newer than the session summary watermark, oldest first (newest `limit` if given)."""
+    query = select(models.ChatMessage).where(models.ChatMessage.session_id == session_id)
+    if after_id is not None:
+        query = query.where(models.ChatMessage.id > after_id)
+    if before_id is not None:
+        query = query.where(models.ChatMessage.id < before_id)
+    if limit is None:
+        result = await db.execute(query.order_by(models.ChatMessage.id.asc()))
+        return result.scalars().all()
+    result = await db.execute(query.order_by(models.ChatMessage.id.desc()).limit(limit))
+    return result.scalars().all()[::-1]
+
+async def count_unsummarized_chat_messages(db: AsyncSession, session_id: int, after_id: int = None):
+    query = select(func.count(models.ChatMessage.id)).where(models.ChatMessage.session_id == session_id)
+    if after_id is not None:
+        query = query.where(models.ChatMessage.id > after_id)
+    return (await db.execute(query)).scalar_one()
+
+async def save_session_summary(db: AsyncSession, session_id: int, context_summary: str, through_id: int):
+    """Store a rolling summary unless a newer one (higher watermark) has already been saved."""
+    result = await db.execute(
+        update(models.ChatSession).where(
+            models.ChatSession.id == session_id,
+            or_(models.ChatSession.summarized_through_id.is_(None),
+                models.ChatSession.summarized_through_id < through_id)
+        ).values(context_summary=context_summary, summarized_through_id=through_id)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+async def get_resume(db: AsyncSession, resume_id: int):
+    return await db.get(models.Resume, resume_id)
+
+async def get_resume_by_hash(db: AsyncSession, user_id: int, content_hash: str):
+    result = await db.execute(
+        select(models.Resume).where(
+            models.Resume.user_id == user_id,
+            models.Resume.content_hash == content_hash
+        ).limit(1)
+    )
+    return result.scalars().first()
+
+async def touch_resume(db: AsyncSession, resume_id: int):
+    """Mark a re-uploaded resume as the user's latest again."""
+    await db.execute(
+        update(models.Resume).where(models.Resume.id == resume_id).values(uploaded_at=datetime.utcnow())
+    )
+    await db.commit()
+
+async def get_latest_resume(db: AsyncSession, user_id: int):
+    # Prompts read resume.profile (see openai_service.resume_prompt_context)
+    result = await db.execute(
+        select(models.Resume).options(selectinload(models.Resume.profile)).where(
+            models.Resume.user_id == user_id
+        ).order_by(models.Resume.uploaded_at.desc()).limit(1)
+    )
+    return result.scalars().first()
+
+async def create_job_resume(db: AsyncSession, job_id: int, resume: schemas.ResumeCreate, profile: dict = None, **job_fields):
+    """
+    Create an ingestion job's resume (and profile) and link it to the job in one
+    transaction, so a crash can never leave a resume the job doesn't know about.
+    """
+    db_resume = models.Resume(**resume.dict())
+    db.add(db_resume)
+    await db.flush()
+    if profile:
+        db.add(models.ResumeProfile(user_id=resume.user_id, resume_id=db_resume.id, **profile))
+    await db.execute(
+        update(models.IngestionJob).where(models.IngestionJob.id == job_id).values(resume_id=db_resume.id, **job_fields)
+    )
+    await db.commit()
+    return db_resume.id
+
+async def get_resume_profile(db: AsyncSession, resume_id: int):
+    result = await db.execute(
+        select(models.ResumeProfile).where(models.ResumeProfile.resume_id == resume_id).limit(1)
+    )
+    return result.scalars().first()
+
+async def create_career_recommendation(db: AsyncSession, recommendation: schemas.CareerRecommendationCreate):
+    db_recommendation = models.CareerRecommendation(**recommendation.dict())
+    db.add(db_recommendation)
+    await db.commit()
+    await db.refresh(db_recommendation)
+    return db_recommendation
+
+async def get_cached_roadmap(db: AsyncSession, user_id: int, resume_id: int, prompt_version: str):
+    # Steps are loaded up front so save_roadmap can replace them without a lazy load
+    result = await db.execute(
+        select(models.Roadmap).options(selectinload(models.Roadmap.steps)).where(
+            models.Roadmap.user_id == user_id,
+            models.Roadmap.resume_id == resume_id,
+            models.Roadmap.prompt_version == prompt_version
+        ).order_by(models.Roadmap.refreshed_at.desc()).limit(1)
+    )
+    return result.scalars().first()
+
+async def save_roadmap(db: AsyncSession, user_id: int, resume_id: int, prompt_version: str, steps: list):
+    """Insert or refresh the cached roadmap for (user, resume, prompt version)."""
+    db_roadmap = await get_cached_roadmap(db, user_id, resume_id, prompt_version)
+    if db_roadmap is None:
+        db_roadmap = models.Roadmap(user_id=user_id, resume_id=resume_id, prompt_version=prompt_version, steps=[])
+        db.add(db_roadmap)
+    db_roadmap.title = "Career Roadmap"
+    db_roadmap.content = steps
+    db_roadmap.refreshed_at = datetime.utcnow()
+    db_roadmap.steps = [
+        models.RoadmapStep(step_name=step.get("step", ""), status=step.get("status", "pending"))
+        for step in steps if isinstance(step, dict)
+    ]
+    await db.commit()
+    return db_roadmap
+
+async def get_resume_skill_scores(db: AsyncSession, resume_id: int):
+    result = await db.execute(
+        select(models.ProgressTracking).where(
+            models.ProgressTracking.resume_id == resume_id
+        ).order_by(models.ProgressTracking.id.asc())
+    )
+    return result.scalars().all()
+
+async def save_skill_scores(db: AsyncSession, user_id: int, resume_id: int, skills: list, scores: list):
+    """
+    Record one ProgressTracking row per skill computed from a resume (scores already
+    validated). An empty result is stored as a single row with no skill, so the
+    resume still counts as analyzed and the LLM isn't asked again.
+    """
+    now = datetime.utcnow()
+    rows = [
+        models.ProgressTracking(user_id=user_id, resume_id=resume_id, skill_name=str(skill), score=float(score), date=now)
+        for skill, score in zip(skills, scores)
+    ] or [models.ProgressTracking(user_id=user_id, resume_id=resume_id, skill_name=None, score=None, date=now)]
+    db.add_all(rows)
+    await db.commit()
+    return rows
+
+async def create_ingestion_job(db: AsyncSession, user_id: int, filename: str, file_path: str, session_id: int = None, **fields):
+    db_job = models.IngestionJob(user_id=user_id, filename=filename, file_path=file_path, session_id=session_id, **fields)
+    db.add(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+async def get_ingestion_job(db: AsyncSession, job_id: int):
+    return await db.get(models.IngestionJob, job_id)
+
+async def update_ingestion_job(db: AsyncSession, job_id: int, **fields):
+    db_job = await get_ingestion_job(db, job_id)
+    if db_job:
+        for key, value in fields.items():
+            setattr(db_job, key, value)
+        await db.commit()
+        await db.refresh(db_job)
+    return db_job
+
+async def transition_ingestion_job(db: AsyncSession, job_id: int, from_status: str, **fields):
+    """
+    Update a job only if it is still in `from_status`; False means another worker or
+    request got there first. Used to claim queued jobs and re-queue failed ones.
+    """
+    result = await db.execute(
+        update(models.IngestionJob).where(
+            models.IngestionJob.id == job_id,
+            models.IngestionJob.status == from_status
+        ).values(**fields)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+async def requeue_interrupted_ingestion_jobs(db: AsyncSession):
+    """Put jobs a previous process died while running back in the queue (startup only)."""
+    result = await db.execute(
+        update(models.IngestionJob).where(models.IngestionJob.status == "running").values(status="queued")
+    )
+    await db.commit()
+    return result.rowcount
+
+async def get_active_ingestion_job_by_hash(db: AsyncSession, user_id: int, content_hash: str):
+    result = await db.execute(
+        select(models.IngestionJob).where(
+            models.IngestionJob.user_id == user_id,
+            models.IngestionJob.content_hash == content_hash,
+            models.IngestionJob.status.in_(["queued", "running"])
+        ).limit(1)
+    )
+    return result.scalars().first()
+
+async def get_latest_ingestion_job_for_resume(db: AsyncSession, user_id: int, resume_id: int):
+    result = await db.execute(
+        select(models.IngestionJob).where(
+            models.IngestionJob.user_id == user_id,
+            models.IngestionJob.resume_id == resume_id
+        ).order_by(models.IngestionJob.id.desc()).limit(1)
+    )
+    return result.scalars().first()
+
+async def get_queued_ingestion_jobs(db: AsyncSession):
+    result = await db.execute(
+        select(models.IngestionJob).where(
+            models.IngestionJob.status == "queued"
+        ).order_by(models.IngestionJob.id.asc())
+    )
+    return result.scalars().all()
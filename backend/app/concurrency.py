@@ -0,0 +1,41 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from . import database
+
+# Bounded pool for blocking work (sync SQLAlchemy sessions, Chroma queries) so
+# async handlers never stall the event loop and bursts can't spawn unbounded threads
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "16"))
+
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable on the bounded executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+async def run_async_db(func, *args, **kwargs):
+    """
+    Await `func(db, *args, **kwargs)` with its own AsyncSession from the async engine.
+    Used by background tasks that outlive the request-scoped get_async_db session.
+    """
+    async with database.AsyncSessionLocal() as db:
+        return await func(db, *args, **kwargs)
+
+# In-flight tasks keyed by caller-chosen keys (see single_flight)
+_inflight = {}
+
+def single_flight(key, coro_factory) -> asyncio.Future:
+    """
+    Start `coro_factory()` as a task unless one is already running for `key`,
+    and return a shielded awaitable for it. Collapses duplicate expensive calls
+    (e.g. Streamlit reruns hitting the same LLM-backed endpoint) into one; a
+    cancelled waiter (client disconnect) never cancels the shared work.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(coro_factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return asyncio.shield(task)
@@ -1,7 +1,11 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from . import models, schemas
 from datetime import datetime
 
+# Sessions kept per user; creating one more rotates out the oldest
+MAX_CHAT_SESSIONS = 10
+
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
@@ -16,41 +20,44 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 def create_chat_session(db: Session, session: schemas.ChatSessionCreate):
-    # Count existing sessions for this user
-    user_sessions = db.query(models.ChatSession).filter(
+    """
+    Create the user's next session. Once MAX_CHAT_SESSIONS exist the oldest one is
+    rotated out with set-based statements in a single transaction: delete its
+    messages and the session, shift the remaining numbers down, insert the new one.
+    Returns (new_session, removed_session_ids) so callers can purge their vectors.
+    """
+    session_count = db.query(func.count(models.ChatSession.id)).filter(
         models.ChatSession.user_id == session.user_id
-    ).order_by(models.ChatSession.session_number.asc()).all()
+    ).scalar()
     
-    session_count = len(user_sessions)
-    
-    # If user already has 10 sessions, delete the oldest one (and its messages)
-    if session_count >= 10:
-        oldest_session = user_sessions[0]
+    # Session numbers are kept contiguous (1..N), so the oldest ones are the lowest numbers
+    overflow = session_count - MAX_CHAT_SESSIONS + 1
+    removed_session_ids = []
+    if overflow > 0:
+        removed_session_ids = [row.id for row in db.query(models.ChatSession.id).filter(
+            models.ChatSession.user_id == session.user_id,
+            models.ChatSession.session_number <= overflow
+        )]
         db.query(models.ChatMessage).filter(
-            models.ChatMessage.session_id == oldest_session.id
-        ).delete()
-        db.delete(oldest_session)
-        db.commit()
-        # Renumber remaining sessions 1-9
-        remaining = db.query(models.ChatSession).filter(
+            models.ChatMessage.session_id.in_(removed_session_ids)
+        ).delete(synchronize_session=False)
+        db.query(models.ChatSession).filter(
+            models.ChatSession.id.in_(removed_session_ids)
+        ).delete(synchronize_session=False)
+        db.query(models.ChatSession).filter(
             models.ChatSession.user_id == session.user_id
-        ).order_by(models.ChatSession.created_at.asc()).all()
-        for i, s in enumerate(remaining, start=1):
-            s.session_number = i
-        db.commit()
-        next_number = 10
-    else:
-        next_number = session_count + 1
+        ).update({models.ChatSession.session_number: models.ChatSession.session_number - overflow}, synchronize_session=False)
+        session_count -= overflow
     
     db_session = models.ChatSession(
         user_id=session.user_id,
-        session_number=next_number,
+        session_number=session_count + 1,
         summary=session.summary
     )
     db.add(db_session)
     db.commit()
     db.refresh(db_session)
-    return db_session
+    return db_session, removed_session_ids
 
 def update_chat_session(db: Session, session_id: int, resume_id: int = None, summary: str = None):
     session = db.query(models.ChatSession).filter(models.ChatSession.id == session_id).first()
@@ -84,6 +91,21 @@ def create_chat_message(db: Session, message: schemas.ChatMessageCreate):
 def get_chat_messages(db: Session, session_id: int):
     return db.query(models.ChatMessage).filter(models.ChatMessage.session_id == session_id).order_by(models.ChatMessage.timestamp).all()
 
+def get_chat_messages_page(db: Session, session_id: int, limit: int, before_id: int = None, after_id: int = None):
+    """
+    Keyset page of a session's messages, oldest first. `after_id` returns messages
+    newer than the client's last one; `before_id` the page just older than its first;
+    neither returns the newest page.
+    """
+    query = db.query(models.ChatMessage).filter(models.ChatMessage.session_id == session_id)
+    if after_id is not None:
+        return query.filter(models.ChatMessage.id > after_id).order_by(models.ChatMessage.id.asc()).limit(limit).all()
+    if before_id is not None:
+        query = query.filter(models.ChatMessage.id < before_id)
+    page = query.order_by(models.ChatMessage.id.desc()).limit(limit).all()
+    page.reverse()
+    return page
+
 def create_resume(db: Session, resume: schemas.ResumeCreate):
     db_resume = models.Resume(**resume.dict())
     db.add(db_resume)
@@ -100,3 +122,13 @@ def create_career_recommendation(db: Session, recommendation: schemas.CareerReco
 
 def get_latest_resume(db: Session, user_id: int):
     return db.query(models.Resume).filter(models.Resume.user_id == user_id).order_by(models.Resume.uploaded_at.desc()).first()
+
+def get_progress_history(db: Session, user_id: int):
+    # Rows without a skill only mark a resume whose analysis found nothing
+    return db.query(models.ProgressTracking).filter(
+        models.ProgressTracking.user_id == user_id,
+        models.ProgressTracking.skill_name.isnot(None)
+    ).order_by(models.ProgressTracking.date.asc(), models.ProgressTracking.id.asc()).all()
+
+def get_ingestion_job(db: Session, job_id: int):
+    return db.query(models.IngestionJob).filter(models.IngestionJob.id == job_id).first()
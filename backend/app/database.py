@@ -1,21 +1,197 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Connection pool tuning (SQLAlchemy defaults are 5 + 10 with no pre-ping/recycle)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Counters for connection checkouts, waits and overflow, read by GET /metrics/db-pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def record_wait(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self, pool):
+        with self._lock:
+            self.checkouts += 1
+            if isinstance(pool, QueuePool):
+                self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+                # overflow() is negative while the base pool still has unopened slots
+                self.peak_overflow = max(self.peak_overflow, pool.overflow(), 0)
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_ms / self.waits, 3) if self.waits else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+            }
+        stats["pool_class"] = type(pool).__name__
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "max_overflow": DB_MAX_OVERFLOW,
+                "timeout": DB_POOL_TIMEOUT,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return stats
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    metrics = pool_metrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait((time.perf_counter() - started) * 1000, timed_out=True)
+            raise
+        self.metrics.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+
+class AsyncInstrumentedQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Same instrumentation for the asyncio engine's pool."""
+
+    metrics = async_pool_metrics
+
+
+def _engine_options(url: str, poolclass=InstrumentedQueuePool) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url and url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") == "sqlite:"):
+        # In-memory SQLite keeps a single connection per thread; pool sizing does not apply
+        return options
+    options.update({
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    })
+    return options
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.increment("connects")
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.record_checkout(engine.pool)
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_metrics.increment("checkins")
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.increment("invalidations")
+
+
+def _async_database_url(url: str) -> str:
+    """Map the sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+        sslmode = parsed.query.get("sslmode")
+        if sslmode:
+            # asyncpg takes ssl=<mode> rather than libpq's sslmode=<mode>
+            parsed = parsed.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+        return parsed.render_as_string(hide_password=False)
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(DATABASE_URL)
+
+# Async engine for the async routers: DB I/O is awaited instead of blocking the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, AsyncInstrumentedQueuePool))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _on_async_connect(dbapi_connection, connection_record):
+    async_pool_metrics.increment("connects")
+
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _on_async_checkout(dbapi_connection, connection_record, connection_proxy):
+    async_pool_metrics.record_checkout(async_engine.sync_engine.pool)
+
+@event.listens_for(async_engine.sync_engine, "checkin")
+def _on_async_checkin(dbapi_connection, connection_record):
+    async_pool_metrics.increment("checkins")
+
+@event.listens_for(async_engine.sync_engine, "invalidate")
+def _on_async_invalidate(dbapi_connection, connection_record, exception):
+    async_pool_metrics.increment("invalidations")
+
 Base = declarative_base()
 
 def get_db():
+    """Shared FastAPI dependency: one session per request, always closed afterwards."""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Async counterpart of get_db for `async def` handlers."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,20 +1,34 @@
-from fastapi import FastAPI, Depends, HTTPException
+import math
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from . import models, schemas, crud, database
-from .database import engine
-from .routers import resume, chat, roadmap, analytics, career, progress, auth
+from .database import engine, get_db
+from .routers import resume, chat, roadmap, analytics, career, progress, auth, metrics, maintenance
+from .services import ingestion_service
+from .services.llm_gateway import LLMUnavailableError
+from .timing import server_timing_middleware
+from contextlib import asynccontextmanager
 
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="AI Career Recommender")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background worker pool for resume ingestion jobs
+    await ingestion_service.start_workers()
+    yield
+    await ingestion_service.stop_workers()
+    await database.async_engine.dispose()
 
-# Dependency
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+app = FastAPI(title="AI Career Recommender", lifespan=lifespan)
+# Per-stage latencies in a Server-Timing header (read by load_test.py and browser devtools)
+app.middleware("http")(server_timing_middleware)
+
+@app.exception_handler(LLMUnavailableError)
+async def llm_unavailable_handler(request: Request, exc: LLMUnavailableError):
+    # Overload, an open circuit or exhausted retries are temporary: tell clients when to retry
+    headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after or 1)))}
+    return JSONResponse(status_code=503, content={"detail": f"AI service temporarily unavailable: {exc}"}, headers=headers)
 
 @app.get("/")
 def read_root():
@@ -34,3 +48,5 @@ app.include_router(roadmap.router)
 app.include_router(analytics.router)
 app.include_router(career.router)
 app.include_router(progress.router)
+app.include_router(metrics.router)
+app.include_router(maintenance.router)
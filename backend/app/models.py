@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -20,13 +20,18 @@ class User(Base):
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ix_chat_sessions_user_id_session_number", "user_id", "session_number"), # get_chat_sessions
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     session_number = Column(Integer, nullable=False, default=1)  # Per-user session number (1-10)
     resume_id = Column(Integer, ForeignKey("resumes.id"), nullable=True) # Link to specific resume
     created_at = Column(DateTime, default=datetime.utcnow)
-    summary = Column(String, nullable=True)
+    summary = Column(String, nullable=True)  # Short title shown in the sidebar (set by the frontend)
+    context_summary = Column(Text, nullable=True)  # Rolling LLM summary of older turns (see session_summarizer)
+    summarized_through_id = Column(Integer, nullable=True)  # Last chat_messages.id folded into context_summary
 
     user = relationship("User", back_populates="chat_sessions")
     resume = relationship("Resume")
@@ -34,6 +39,11 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_timestamp", "session_id", "timestamp"), # get_chat_messages
+        Index("ix_chat_messages_session_id_id", "session_id", "id"), # get_chat_messages_page (keyset)
+        Index("ix_chat_messages_user_id_timestamp", "user_id", "timestamp"), # get_all_user_chat_messages
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"))
@@ -46,14 +56,53 @@ class ChatMessage(Base):
 
 class Resume(Base):
     __tablename__ = "resumes"
+    __table_args__ = (
+        Index("ix_resumes_user_id_uploaded_at", "user_id", "uploaded_at"), # get_latest_resume
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     file_path = Column(String)
+    content_hash = Column(String(64), nullable=True, index=True) # SHA-256 of the uploaded file
     parsed_content = Column(Text) # JSON string or raw text
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="resumes")
+    profile = relationship("ResumeProfile", back_populates="resume", uselist=False)
+
+class ResumeProfile(Base):
+    __tablename__ = "resume_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id"), unique=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    skills = Column(JSON) # list of skill names
+    experience_level = Column(String, nullable=True) # Junior/Mid/Senior
+    years_experience = Column(Float, nullable=True)
+    education = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    resume = relationship("Resume", back_populates="profile")
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+    __table_args__ = (
+        Index("ix_ingestion_jobs_user_id_content_hash", "user_id", "content_hash"), # get_active_ingestion_job_by_hash
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    session_id = Column(Integer, nullable=True) # Chat session to link the resume to (not a FK: sessions rotate)
+    resume_id = Column(Integer, ForeignKey("resumes.id"), nullable=True) # Set once the resume row exists
+    filename = Column(String)
+    file_path = Column(String)
+    content_hash = Column(String(64), nullable=True) # SHA-256 of the uploaded file
+    status = Column(String, default="queued", index=True) # queued/running/completed/failed
+    stage = Column(String, default="stored") # stored/parsing/extracting/saving/embedding/done
+    error = Column(Text, nullable=True)
+    parse_stats = Column(JSON, nullable=True) # Page count and per-page extraction timings
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class CareerRecommendation(Base):
     __tablename__ = "career_recommendations"
@@ -69,9 +118,14 @@ class CareerRecommendation(Base):
 
 class ProgressTracking(Base):
     __tablename__ = "progress_tracking"
+    __table_args__ = (
+        Index("ix_progress_tracking_resume_id", "resume_id"), # get_resume_skill_scores
+        Index("ix_progress_tracking_user_id_date", "user_id", "date"), # get_progress_history
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
+    resume_id = Column(Integer, ForeignKey("resumes.id"), nullable=True) # Resume the score was computed from
     skill_name = Column(String)
     score = Column(Float)
     date = Column(DateTime, default=datetime.utcnow)
@@ -80,18 +134,28 @@ class ProgressTracking(Base):
 
 class Roadmap(Base):
     __tablename__ = "roadmaps"
+    __table_args__ = (
+        Index("ix_roadmaps_user_id_resume_id_prompt_version", "user_id", "resume_id", "prompt_version"), # get_cached_roadmap
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     career_id = Column(Integer, ForeignKey("career_recommendations.id"), nullable=True) # Link to specific recommendation
+    resume_id = Column(Integer, ForeignKey("resumes.id"), nullable=True) # Resume the roadmap was generated from (cache key)
+    prompt_version = Column(String, nullable=True) # Prompt version used, bumping it invalidates cached roadmaps
     title = Column(String)
+    content = Column(JSON, nullable=True) # Full generated roadmap as returned by the API
     created_at = Column(DateTime, default=datetime.utcnow)
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="roadmaps")
-    steps = relationship("RoadmapStep", back_populates="roadmap")
+    steps = relationship("RoadmapStep", back_populates="roadmap", cascade="all, delete-orphan")
 
 class RoadmapStep(Base):
     __tablename__ = "roadmap_steps"
+    __table_args__ = (
+        Index("ix_roadmap_steps_roadmap_id", "roadmap_id"), # Roadmap.steps
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     roadmap_id = Column(Integer, ForeignKey("roadmaps.id"))
@@ -1,39 +1,90 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import schemas, crud, database, models
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import async_crud
+from ..database import get_async_db
 from ..services import openai_service
+from ..services.llm_gateway import LLMUnavailableError
+from ..concurrency import run_async_db, single_flight
+from ..timing import stage
 import json
+import math
+import re
 
 router = APIRouter(
     prefix="/analytics",
     tags=["analytics"]
 )
 
-# Dependency
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+def _to_analytics(rows: list):
+    rows = [row for row in rows if row.skill_name is not None]  # skip the "nothing found" marker
+    return {
+        "Skill": [row.skill_name for row in rows],
+        "Score": [row.score for row in rows]
+    }
+
+def _coerce_score(value):
+    """LLM scores come as 80, "80", "80%" or "N/A": return a 0-100 float, or None if unusable."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        score = float(value)
+    elif isinstance(value, str) and (match := _NUMBER_RE.search(value)):
+        score = float(match.group())
+    else:
+        return None
+    return None if math.isnan(score) else min(max(score, 0.0), 100.0)
+
+def _parse_skill_scores(analytics_data):
+    """Validate the LLM's {"Skill": [...], "Score": [...]} reply into (skills, scores) lists."""
+    if not isinstance(analytics_data, dict):
+        raise ValueError("AI response is not a JSON object with 'Skill' and 'Score' lists")
+    skills = analytics_data.get("Skill") or []
+    scores = analytics_data.get("Score") or []
+    if not isinstance(skills, list) or not isinstance(scores, list):
+        raise ValueError("AI response 'Skill' and 'Score' must be lists")
+    if len(skills) != len(scores):
+        raise ValueError(f"AI response has {len(skills)} skills but {len(scores)} scores")
+    pairs = [(str(skill).strip(), _coerce_score(score)) for skill, score in zip(skills, scores) if skill is not None]
+    pairs = [(skill, score) for skill, score in pairs if skill and score is not None]
+    return [skill for skill, _ in pairs], [score for _, score in pairs]
+
+async def _analyze_and_store(user_id: int, resume_id: int, resume_context: str):
+    with stage("llm"):
+        analytics_json_str = await openai_service.analyze_skills(resume_context)
+    # Clean potential markdown
+    if "```json" in analytics_json_str:
+        analytics_json_str = analytics_json_str.split("```json")[1].split("```")[0].strip()
+    elif "```" in analytics_json_str:
+        analytics_json_str = analytics_json_str.split("```")[1].split("```")[0].strip()
+
+    skills, scores = _parse_skill_scores(json.loads(analytics_json_str))
+    # Record as ProgressTracking history so later page views (and the growth chart) reuse it
+    rows = await run_async_db(async_crud.save_skill_scores, user_id, resume_id, skills, scores)
+    return _to_analytics(rows)
 
 @router.get("/{user_id}")
-async def get_analytics(user_id: int, db: Session = Depends(get_db)):
+async def get_analytics(user_id: int, db: AsyncSession = Depends(get_async_db)):
     # 1. Fetch latest resume
-    latest_resume = crud.get_latest_resume(db, user_id)
+    with stage("db"):
+        latest_resume = await async_crud.get_latest_resume(db, user_id)
     if not latest_resume:
         raise HTTPException(status_code=404, detail="No resume found. Please upload a resume first.")
     
-    # 2. Generate Analytics via OpenAI
+    # 2. Serve scores already computed for this resume
+    stored_scores = await async_crud.get_resume_skill_scores(db, latest_resume.id)
+    if stored_scores:
+        return _to_analytics(stored_scores)
+    
+    # 3. New resume: generate analytics via OpenAI (once, even across concurrent requests)
+    resume_context = openai_service.resume_prompt_context(latest_resume)
     try:
-        analytics_json_str = await openai_service.analyze_skills(latest_resume.parsed_content)
-        # Clean potential markdown
-        if "```json" in analytics_json_str:
-            analytics_json_str = analytics_json_str.split("```json")[1].split("```")[0].strip()
-        elif "```" in analytics_json_str:
-            analytics_json_str = analytics_json_str.split("```")[1].split("```")[0].strip()
-
-        analytics_data = json.loads(analytics_json_str)
-        return analytics_data
+        return await single_flight(
+            ("analytics", latest_resume.id),
+            lambda: _analyze_and_store(user_id, latest_resume.id, resume_context)
+        )
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate analytics: {str(e)}")
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from .. import schemas, crud, database, models
+from .. import schemas, crud, models
+from ..database import get_db
 from ..auth import verify_password, get_password_hash
 
 router = APIRouter(
@@ -8,13 +9,6 @@ router = APIRouter(
     tags=["auth"]
 )
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/register")
 def register(user: schemas.UserRegister, db: Session = Depends(get_db)):
     # Check if username already exists
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import schemas, crud, database
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import schemas, async_crud
+from ..database import get_async_db
 from ..services import openai_service
 import json
 
@@ -9,22 +10,14 @@ router = APIRouter(
     tags=["careers"]
 )
 
-# Dependency
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/recommendations/{user_id}")
-async def get_career_recommendations(user_id: int, user_skills: str, experience_level: str, db: Session = Depends(get_db)):
-    # 1. Fetch latest resume content
-    # For simplicity, we just take user inputs or fetch from DB if needed.
-    # Here we assume basic inputs are provided or we could fetch the last resume.
+async def get_career_recommendations(user_id: int, user_skills: str, experience_level: str, db: AsyncSession = Depends(get_async_db)):
+    # 1. Fetch the compact profile of the latest resume (falls back to raw text for older uploads)
+    latest_resume = await async_crud.get_latest_resume(db, user_id)
+    resume_content = openai_service.resume_prompt_context(latest_resume) if latest_resume else "No resume uploaded yet."
     
     # 2. Call OpenAI Service
-    recommendations_json = await openai_service.generate_career_paths(user_skills, "Resume content placeholder", experience_level)
+    recommendations_json = await openai_service.generate_career_paths(user_skills, resume_content, experience_level)
     
     # 3. Parse JSON and store in DB
     try:
@@ -37,7 +30,7 @@ async def get_career_recommendations(user_id: int, user_skills: str, experience_
                 reasoning=rec.get("Why it is suitable", ""),
                 salary_range=rec.get("Estimated Salary Range", "")
             )
-            saved_rec = crud.create_career_recommendation(db, rec_data)
+            saved_rec = await async_crud.create_career_recommendation(db, rec_data)
             saved_recs.append(saved_rec)
         return saved_recs
     except json.JSONDecodeError:
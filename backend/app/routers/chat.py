@@ -1,95 +1,212 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .. import schemas, crud, database, models
-from ..services import openai_service, chroma_service
+from .. import schemas, crud, async_crud
+from ..database import get_db
+from ..services import openai_service, chroma_service, session_summarizer
+from ..services.llm_gateway import LLMUnavailableError
+from ..concurrency import run_blocking, run_async_db
+from ..timing import stage
+import asyncio
+import json
+import os
+
+# Page size for GET /chat/history (keyset pagination)
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))
+CHAT_HISTORY_MAX_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_MAX_PAGE_SIZE", "200"))
 
 router = APIRouter(
     prefix="/chat",
     tags=["chat"]
 )
 
-# Dependency
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/sessions/", response_model=schemas.ChatSession)
-def create_session(session: schemas.ChatSessionCreate, db: Session = Depends(get_db)):
-    return crud.create_chat_session(db, session)
+def create_session(session: schemas.ChatSessionCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    db_session, removed_session_ids = crud.create_chat_session(db, session)
+    if removed_session_ids:
+        # Rotated-out sessions must not keep surfacing as cross-session context
+        background_tasks.add_task(chroma_service.delete_session_chats, str(session.user_id), removed_session_ids)
+    return db_session
 
 @router.get("/sessions/{user_id}")
 def get_sessions(user_id: int, db: Session = Depends(get_db)):
     return crud.get_chat_sessions(db, user_id)
 
-@router.get("/history/{session_id}")
-def get_messages(session_id: int, db: Session = Depends(get_db)):
-    return crud.get_chat_messages(db, session_id)
+@router.get("/history/{session_id}", response_model=list[schemas.ChatMessage])
+def get_messages(
+    session_id: int,
+    limit: int = Query(CHAT_HISTORY_PAGE_SIZE, ge=1, le=CHAT_HISTORY_MAX_PAGE_SIZE),
+    before_id: int = None,
+    after_id: int = None,
+    db: Session = Depends(get_db)
+):
+    """
+    One keyset page of the session's messages, oldest first.
+    - no cursor: the newest `limit` messages
+    - before_id: the `limit` messages just older than that id ("load earlier")
+    - after_id: messages newer than that id, i.e. only what the client is missing
+    """
+    if before_id is not None and after_id is not None:
+        raise HTTPException(status_code=400, detail="Use either before_id or after_id, not both")
+    return crud.get_chat_messages_page(db, session_id, limit, before_id=before_id, after_id=after_id)
 
-@router.post("/messages/", response_model=schemas.ChatMessage)
-async def create_message(message: schemas.ChatMessageCreate, db: Session = Depends(get_db)):
-    # Save user message
-    db_message = crud.create_chat_message(db, message)
-    
-    # Add to ChromaDB
-    chroma_service.add_chat_to_vector_store(message.content, str(message.user_id), str(message.session_id), str(db_message.id))
-    
-    # --- Build rich context for AI ---
-    
-    # 1. Resume context
-    current_session = db.query(models.ChatSession).filter(models.ChatSession.id == message.session_id).first()
-    
-    resume_id = None
+async def _resolve_resume_id(db: AsyncSession, session_id: int, user_id: int):
+    # Prefer the resume linked to this session, fall back to the user's latest upload
+    current_session = await async_crud.get_chat_session(db, session_id)
     if current_session and current_session.resume_id:
-        resume_id = str(current_session.resume_id)
-    else:
-        latest_resume = crud.get_latest_resume(db, message.user_id)
-        resume_id = str(latest_resume.id) if latest_resume else None
-    
-    resume_context = chroma_service.query_resume_context(message.content, str(message.user_id), resume_id=resume_id)
-    
-    # 2. Current session context (recent conversation flow)
-    history_context = chroma_service.query_chat_history(message.content, str(message.session_id))
-    
-    # 3. Cross-session user context (what user discussed in ALL past sessions)
-    cross_session_context = chroma_service.query_user_chat_history(message.content, str(message.user_id))
-    
-    # 4. Get user profile info
-    user = db.query(models.User).filter(models.User.id == message.user_id).first()
+        return str(current_session.resume_id)
+    latest_resume = await async_crud.get_latest_resume(db, user_id)
+    return str(latest_resume.id) if latest_resume else None
+
+async def _load_user_profile(db: AsyncSession, user_id: int, resume_id: str = None):
+    user = await async_crud.get_user(db, user_id)
     user_profile = f"Username: {user.username}, Email: {user.email}" if user else ""
-    
-    # 5. Get summaries of all user sessions for broader awareness
-    all_sessions = crud.get_chat_sessions(db, message.user_id)
-    session_summaries = "\n".join([
-        f"Session {s.session_number}: {s.summary or 'No summary'}"
+    # Compact structured profile extracted at upload time
+    resume_profile = await async_crud.get_resume_profile(db, int(resume_id)) if resume_id else None
+    if resume_profile:
+        user_profile += "\n" + openai_service.format_resume_profile(resume_profile)
+    return user_profile
+
+async def _load_session_summaries(db: AsyncSession, user_id: int, session_id: int = None):
+    # Oldest first; sessions without a summary (and the current one) add nothing to the prompt.
+    # The rolling LLM summary is preferred over the short sidebar title.
+    all_sessions = await async_crud.get_chat_sessions(db, user_id)
+    return [
+        f"Session {s.session_number}: {s.context_summary or s.summary}"
         for s in all_sessions
-    ])
+        if (s.context_summary or s.summary) and s.id != session_id
+    ]
+
+async def _load_resume_context_and_profile(message: schemas.ChatMessageCreate, query_embedding):
+    resume_id = await run_async_db(_resolve_resume_id, message.session_id, message.user_id)
+    return await asyncio.gather(
+        run_blocking(
+            chroma_service.query_resume_context,
+            message.content, str(message.user_id), resume_id=resume_id, query_embedding=query_embedding
+        ),
+        run_async_db(_load_user_profile, message.user_id, resume_id)
+    )
+
+async def _prepare_chat_context(message: schemas.ChatMessageCreate):
+    """Save the user message and gather every context source the prompt needs."""
+    # DB calls are awaited on the async engine (each with its own session, so they
+    # can run concurrently); blocking Chroma work runs on the bounded executor.
     
-    # 6. Call OpenAI with full context
-    ai_response_text = await openai_service.generate_chat_response(
-        message.content, history_context, resume_context,
-        cross_session_context=cross_session_context,
-        user_profile=user_profile,
-        session_summaries=session_summaries
+    # Save user message and embed it concurrently; the vector is reused for every Chroma add/query below
+    db_message, query_embedding = await asyncio.gather(
+        run_async_db(async_crud.create_chat_message, message),
+        chroma_service.embed_text_async(message.content)
     )
     
-    # 7. Store AI response
+    # --- Build rich context for AI (independent fetches run concurrently) ---
+    (
+        _,
+        (resume_context,         # 1. Resume context
+         user_profile),          # 2. User profile info + structured resume profile
+        (session_summary,        # 3. Current session: rolling summary of older turns
+         history_context),       #    + the newest turns verbatim
+        cross_session_context,   # 4. Cross-session user context (what user discussed in ALL past sessions)
+        session_summaries,       # 5. Summaries of all user sessions for broader awareness
+    ) = await asyncio.gather(
+        run_blocking(
+            chroma_service.add_chat_to_vector_store,
+            message.content, str(message.user_id), str(message.session_id), str(db_message.id),
+            embedding=query_embedding
+        ),
+        _load_resume_context_and_profile(message, query_embedding),
+        run_async_db(session_summarizer.load_session_memory, message.session_id, before_id=db_message.id),
+        run_blocking(
+            chroma_service.query_user_chat_history,
+            message.content, str(message.user_id), query_embedding=query_embedding,
+            exclude_session_id=str(message.session_id)
+        ),
+        run_async_db(_load_session_summaries, message.user_id, message.session_id),
+    )
+    return {
+        "history_context": history_context,
+        "resume_context": resume_context,
+        "cross_session_context": cross_session_context,
+        "user_profile": user_profile,
+        "session_summaries": session_summaries,
+        "session_summary": session_summary,
+    }
+
+async def _store_assistant_message(message: schemas.ChatMessageCreate, ai_response_text: str):
+    # Store AI response
     assistant_message_data = schemas.ChatMessageCreate(
         session_id=message.session_id,
         user_id=message.user_id,
         role="assistant",
         content=ai_response_text
     )
-    db_assistant_message = crud.create_chat_message(db, assistant_message_data)
+    db_assistant_message, assistant_embedding = await asyncio.gather(
+        run_async_db(async_crud.create_chat_message, assistant_message_data),
+        chroma_service.embed_text_async(ai_response_text)
+    )
     
-    # 8. Add to ChromaDB
-    chroma_service.add_chat_to_vector_store(
+    # Add to ChromaDB
+    await run_blocking(
+        chroma_service.add_chat_to_vector_store,
         ai_response_text, 
         str(message.user_id), 
         str(message.session_id), 
-        str(db_assistant_message.id)
+        str(db_assistant_message.id),
+        embedding=assistant_embedding
     )
-    
+    # Keep the session's rolling summary current without delaying the reply
+    session_summarizer.schedule(message.session_id)
     return db_assistant_message
+
+@router.post("/messages/", response_model=schemas.ChatMessage)
+async def create_message(message: schemas.ChatMessageCreate):
+    with stage("context"):
+        context = await _prepare_chat_context(message)
+    
+    # Call OpenAI with full context
+    with stage("llm"):
+        ai_response_text = await openai_service.generate_chat_response(message.content, **context)
+    
+    with stage("store"):
+        return await _store_assistant_message(message, ai_response_text)
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+@router.post("/messages/stream")
+async def stream_message(message: schemas.ChatMessageCreate):
+    """
+    Streaming variant of POST /chat/messages/. Emits Server-Sent Events:
+    {"type": "token"} per text chunk, then {"type": "done"} carrying the stored
+    assistant message, or {"type": "error"} if generation fails.
+    """
+    with stage("context"):
+        context = await _prepare_chat_context(message)
+    
+    async def event_stream():
+        chunks = []
+        try:
+            async for text in openai_service.stream_chat_response(message.content, **context):
+                chunks.append(text)
+                yield _sse({"type": "token", "content": text})
+        except LLMUnavailableError as e:
+            # Headers are already sent, so the 503 travels in the event instead
+            yield _sse({"type": "error", "status": 503, "retry_after": round(e.retry_after or 1, 1),
+                        "detail": f"AI service temporarily unavailable: {str(e)}"})
+            return
+        except Exception as e:
+            yield _sse({"type": "error", "detail": f"Failed to generate response: {str(e)}"})
+            return
+        
+        # Persist the full reply once the stream has finished
+        db_assistant_message = await _store_assistant_message(message, "".join(chunks))
+        yield _sse({
+            "type": "done",
+            "message": schemas.ChatMessage.model_validate(db_assistant_message).model_dump(mode="json")
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,22 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..services import vector_gc
+
+router = APIRouter(
+    prefix="/maintenance",
+    tags=["maintenance"]
+)
+
+@router.post("/vector-gc")
+def run_vector_gc(dry_run: bool = True, drop_unused: bool = False, vacuum: bool = False,
+                  drop: Optional[List[str]] = Query(None), db: Session = Depends(get_db)):
+    """
+    Remove vectors whose chat message / resume no longer exists. Dry run unless dry_run=false.
+    drop_unused removes migrated legacy collections; `drop` names other non-live ones explicitly.
+    """
+    try:
+        return vector_gc.collect_garbage(db, dry_run=dry_run, drop_unused=drop_unused, vacuum=vacuum, drop_names=drop)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
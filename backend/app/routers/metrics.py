@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from ..services.embedding_cache import embedding_cache
+from ..services import chroma_service, openai_service
+from .. import database
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"]
+)
+
+@router.get("/embedding-cache")
+def get_embedding_cache_stats():
+    return embedding_cache.stats()
+
+@router.get("/embedding-batcher")
+def get_embedding_batcher_stats():
+    return chroma_service.embedding_batcher.stats()
+
+@router.get("/vector-partitions")
+def get_vector_partition_stats():
+    return {
+        "resume": chroma_service.resume_collections.stats(),
+        "chat": chroma_service.chat_collections.stats(),
+    }
+
+@router.get("/llm")
+def get_llm_gateway_stats():
+    return openai_service.provider.stats()
+
+@router.get("/db-pool")
+def get_db_pool_stats():
+    stats = database.pool_metrics.snapshot(database.engine.pool)
+    stats["async"] = database.async_pool_metrics.snapshot(database.async_engine.sync_engine.pool)
+    return stats
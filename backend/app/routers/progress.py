@@ -1,27 +1,28 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from .. import schemas, crud, database
+from .. import crud
+from ..database import get_db
 
 router = APIRouter(
     prefix="/progress",
     tags=["progress"]
 )
 
-# Dependency
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # define crud operations for progress/roadmap here or import from crud.py if added there.
 # For now, placeholder endpoints.
 
 @router.get("/{user_id}")
 def get_user_progress(user_id: int, db: Session = Depends(get_db)):
-    # Fetch progress from DB
-    return {"message": "Progress data placeholder"}
+    # Skill score history, one entry per skill per analyzed resume
+    return [
+        {
+            "resume_id": row.resume_id,
+            "Skill": row.skill_name,
+            "Score": row.score,
+            "Date": row.date
+        }
+        for row in crud.get_progress_history(db, user_id)
+    ]
 
 @router.post("/roadmap/update")
 def update_roadmap_step(step_id: int, status: str, db: Session = Depends(get_db)):
@@ -1,56 +1,98 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .. import schemas, crud, database
-from ..services import parser_service, openai_service, chroma_service
-import shutil
+from .. import schemas, crud, async_crud
+from ..database import get_db, get_async_db
+from ..services import ingestion_service, parser_service
+from ..timing import stage
+import aiofiles
+import hashlib
 import os
+import uuid
 from pathlib import Path
 
-# Always resolve to project_root/data/resumes regardless of working directory
+# Always resolve to project_root/data/resumes regardless of working directory (RESUMES_DIR overrides)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent
-RESUMES_DIR = PROJECT_ROOT / "data" / "resumes"
+RESUMES_DIR = Path(os.getenv("RESUMES_DIR", str(PROJECT_ROOT / "data" / "resumes")))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
 router = APIRouter(
     prefix="/resumes",
     tags=["resumes"]
 )
 
-# Dependency
-def get_db():
-    db = database.SessionLocal()
+async def _store_upload(file: UploadFile, upload_dir: Path):
+    """
+    Stream the upload to disk while hashing it in the same pass, then move it to
+    its content-addressed name (<sha256><ext>). Returns (file_path, content_hash).
+    """
+    temp_path = upload_dir / f".upload-{uuid.uuid4().hex}.part"
+    sha256 = hashlib.sha256()
+    size = 0
     try:
-        yield db
-    finally:
-        db.close()
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > parser_service.MAX_RESUME_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Resume exceeds the {parser_service.MAX_RESUME_BYTES // (1024 * 1024)} MB size limit"
+                    )
+                sha256.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    
+    content_hash = sha256.hexdigest()
+    file_path = upload_dir / f"{content_hash}{Path(file.filename).suffix.lower()}"
+    # Same bytes always land on the same name, so replacing an existing copy is harmless
+    os.replace(temp_path, file_path)
+    return str(file_path), content_hash
 
-@router.post("/upload/{user_id}", response_model=schemas.Resume)
-async def upload_resume(user_id: int, session_id: int = None, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    # Save file locally (optional, but good for persistence)
+@router.post("/upload/{user_id}", response_model=schemas.IngestionJob, status_code=202)
+async def upload_resume(user_id: int, session_id: int = None, file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)):
+    # Save file locally; parsing, extraction and embedding run in the background job
     upload_dir = RESUMES_DIR / str(user_id)
     upload_dir.mkdir(parents=True, exist_ok=True)
-    file_path = str(upload_dir / file.filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Reset file pointer after reading
-    await file.seek(0)
+    with stage("store_upload"):
+        file_path, content_hash = await _store_upload(file, upload_dir)
     
-    # Parse generic file content
-    parsed_text = await parser_service.parse_resume(file)
+    # Same content already has a resume row for this user: reuse it instead of re-running the pipeline
+    existing_resume = await async_crud.get_resume_by_hash(db, user_id, content_hash)
+    if existing_resume:
+        await async_crud.touch_resume(db, existing_resume.id)
+        if session_id:
+            await async_crud.update_chat_session(db, session_id, resume_id=existing_resume.id)
+        # The row is created before embedding, so it only proves ingestion finished if its job did
+        last_job = await async_crud.get_latest_ingestion_job_for_resume(db, user_id, existing_resume.id)
+        if last_job is None or last_job.status == "completed":
+            return await async_crud.create_ingestion_job(
+                db, user_id, file.filename, file_path, session_id=session_id, content_hash=content_hash,
+                resume_id=existing_resume.id, status="completed", stage="done"
+            )
+        if last_job.status == "failed":
+            # Re-queue it: process_job sees resume_id set and only redoes the indexing step.
+            # Conditional, so concurrent re-uploads queue it once
+            if await async_crud.transition_ingestion_job(db, last_job.id, "failed", status="queued", stage="stored", error=None):
+                ingestion_service.enqueue(last_job.id)
+            await db.refresh(last_job)
+        return last_job
     
-    # Create DB entry
-    resume_data = schemas.ResumeCreate(user_id=user_id, file_path=file_path, parsed_content=parsed_text)
-    db_resume = crud.create_resume(db, resume_data)
+    # Same content still being ingested: report that job rather than starting another
+    active_job = await async_crud.get_active_ingestion_job_by_hash(db, user_id, content_hash)
+    if active_job:
+        return active_job
     
-    # Extract details using OpenAI
-    extracted_details = await openai_service.extract_resume_details(parsed_text)
+    # Persist the job before queueing so it survives a restart
+    db_job = await async_crud.create_ingestion_job(db, user_id, file.filename, file_path, session_id=session_id, content_hash=content_hash)
+    ingestion_service.enqueue(db_job.id)
     
-    # Store in ChromaDB
-    chroma_service.add_resume_to_vector_store(parsed_text, str(user_id), str(db_resume.id))
-    
-    # Link to session if provided
-    if session_id:
-        crud.update_chat_session(db, session_id, resume_id=db_resume.id)
-    
-    return db_resume
+    return db_job
+
+@router.get("/jobs/{job_id}", response_model=schemas.IngestionJob)
+def get_ingestion_job(job_id: int, db: Session = Depends(get_db)):
+    db_job = crud.get_ingestion_job(db, job_id)
+    if not db_job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return db_job
@@ -1,39 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import schemas, crud, database, models
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import async_crud, models
+from ..database import get_async_db
 from ..services import openai_service
+from ..services.llm_gateway import LLMUnavailableError
+from ..concurrency import run_async_db, single_flight
+from ..timing import stage
+from datetime import datetime, timedelta
+import asyncio
 import json
+import logging
+import os
+
+# Cached roadmaps older than this are still served, but refreshed in the background
+ROADMAP_CACHE_TTL_HOURS = float(os.getenv("ROADMAP_CACHE_TTL_HOURS", "168"))
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/roadmap",
     tags=["roadmap"]
 )
 
-# Dependency
-def get_db():
-    db = database.SessionLocal()
+def _parse_roadmap(roadmap_json_str: str):
+    # Clean potential markdown
+    if "```json" in roadmap_json_str:
+        roadmap_json_str = roadmap_json_str.split("```json")[1].split("```")[0].strip()
+    elif "```" in roadmap_json_str:
+        roadmap_json_str = roadmap_json_str.split("```")[1].split("```")[0].strip()
+    return json.loads(roadmap_json_str)
+
+async def _generate_and_store(user_id: int, resume_id: int, resume_context: str):
+    with stage("llm"):
+        roadmap_json_str = await openai_service.generate_roadmap(resume_context)
+    roadmap_data = _parse_roadmap(roadmap_json_str)
+    await run_async_db(async_crud.save_roadmap, user_id, resume_id, openai_service.ROADMAP_PROMPT_VERSION, roadmap_data)
+    return roadmap_data
+
+def _regenerate(user_id: int, resume_id: int, resume_context: str) -> asyncio.Future:
+    # Streamlit reruns must never trigger duplicate LLM calls for the same roadmap
+    return single_flight(
+        ("roadmap", user_id, resume_id),
+        lambda: _generate_and_store(user_id, resume_id, resume_context)
+    )
+
+async def _refresh_in_background(user_id: int, resume_id: int, resume_context: str):
     try:
-        yield db
-    finally:
-        db.close()
+        await _regenerate(user_id, resume_id, resume_context)
+    except Exception as e:
+        # Keep serving the stale copy; the next request will try again
+        logger.warning("Background roadmap refresh failed for user %s: %s", user_id, e)
+
+def _is_stale(db_roadmap: models.Roadmap) -> bool:
+    refreshed_at = db_roadmap.refreshed_at or db_roadmap.created_at
+    return refreshed_at is None or datetime.utcnow() - refreshed_at > timedelta(hours=ROADMAP_CACHE_TTL_HOURS)
 
 @router.get("/{user_id}")
-async def get_roadmap(user_id: int, db: Session = Depends(get_db)):
+async def get_roadmap(user_id: int, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
     # 1. Fetch latest resume
-    latest_resume = crud.get_latest_resume(db, user_id)
+    with stage("db"):
+        latest_resume = await async_crud.get_latest_resume(db, user_id)
     if not latest_resume:
         raise HTTPException(status_code=404, detail="No resume found. Please upload a resume first.")
     
-    # 2. Generate Roadmap via OpenAI
+    resume_context = openai_service.resume_prompt_context(latest_resume)
+    
+    # 2. Serve the stored roadmap for this resume; refresh expired ones after responding
+    cached = await async_crud.get_cached_roadmap(db, user_id, latest_resume.id, openai_service.ROADMAP_PROMPT_VERSION)
+    if cached is not None and cached.content is not None:
+        if _is_stale(cached):
+            background_tasks.add_task(_refresh_in_background, user_id, latest_resume.id, resume_context)
+        return cached.content
+    
+    # 3. Nothing cached for this resume yet: generate roadmap via OpenAI and store it
     try:
-        roadmap_json_str = await openai_service.generate_roadmap(latest_resume.parsed_content)
-        # Clean potential markdown
-        if "```json" in roadmap_json_str:
-            roadmap_json_str = roadmap_json_str.split("```json")[1].split("```")[0].strip()
-        elif "```" in roadmap_json_str:
-            roadmap_json_str = roadmap_json_str.split("```")[1].split("```")[0].strip()
-            
-        roadmap_data = json.loads(roadmap_json_str)
-        return roadmap_data
+        return await _regenerate(user_id, latest_resume.id, resume_context)
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate roadmap: {str(e)}")
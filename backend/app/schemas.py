@@ -62,10 +62,37 @@ class ResumeBase(BaseModel):
 class ResumeCreate(ResumeBase):
     user_id: int
     file_path: str
+    content_hash: Optional[str] = None
+
+class ResumeProfile(BaseModel):
+    skills: List[str] = []
+    experience_level: Optional[str] = None
+    years_experience: Optional[float] = None
+    education: Optional[str] = None
+
+    class Config:
+        from_attributes = True
 
 class Resume(ResumeBase):
     id: int
     uploaded_at: datetime
+    profile: Optional[ResumeProfile] = None
+
+    class Config:
+        from_attributes = True
+
+class IngestionJob(BaseModel):
+    id: int
+    user_id: int
+    session_id: Optional[int] = None
+    resume_id: Optional[int] = None
+    filename: str
+    status: str
+    stage: str
+    error: Optional[str] = None
+    parse_stats: Optional[dict] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -1,89 +1,195 @@
-import google.generativeai as genai
+import asyncio
 import chromadb
+from chromadb.errors import NotFoundError
 import os
+import re
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
+from .embedding_backends import EMBEDDING_BACKEND, create_embedding_function
+from .embedding_batcher import EmbeddingBatcher
+from .resume_chunker import chunk_resume
+from .vector_partitions import PartitionedCollection
 
 load_dotenv()
 
 # Always resolve to project_root/data/chroma_db regardless of working directory
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent  # backend/app/services -> root
-CHROMA_DB_PATH = str(PROJECT_ROOT / "data" / "chroma_db")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=GOOGLE_API_KEY)
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", str(PROJECT_ROOT / "data" / "chroma_db"))
+# Number of resume chunks retrieved per chat turn
+RESUME_CONTEXT_CHUNKS = int(os.getenv("RESUME_CONTEXT_CHUNKS", "3"))
+# Max ids per `$in` filter when deleting vectors in bulk
+CHROMA_DELETE_BATCH_SIZE = int(os.getenv("CHROMA_DELETE_BATCH_SIZE", "100"))
 
 # Initialize ChromaDB Client
 client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
 
-# Use Google Gemini Embeddings - direct SDK implementation
-class GeminiEmbeddingFunction(chromadb.EmbeddingFunction):
-    def __init__(self, model_name="models/gemini-embedding-001"):
-        self.model_name = model_name
-    def __call__(self, input):
-        # input is a list of strings
-        if isinstance(input, str):
-            input = [input]
-        response = genai.embed_content(model=self.model_name, content=input)
-        return response['embedding']
-    def embed_query(self, text=None, **kwargs):
-        # Handle case where Chroma calls with 'input' keyword
-        content = text if text is not None else kwargs.get("input")
-        if content is None:
-            raise ValueError("No text provided for embedding query")
-        response = genai.embed_content(model=self.model_name, content=content)
-        return response['embedding']
-    def name(self):
-        return "gemini_embeddings"
-
-chroma_gemini_ef = GeminiEmbeddingFunction()
-
-resume_collection = client.get_or_create_collection(name="resume_embeddings_v4", embedding_function=chroma_gemini_ef)
-chat_collection = client.get_or_create_collection(name="chat_history_embeddings_v4", embedding_function=chroma_gemini_ef)
-
-def add_resume_to_vector_store(resume_text: str, user_id: str, resume_id: str):
+# Embedding backend chosen by EMBEDDING_BACKEND (remote Gemini API or local CPU hashing)
+embedding_function = create_embedding_function()
+# Backends produce different vector sizes, so each gets its own collections
+_BACKEND_SUFFIX = "" if EMBEDDING_BACKEND == "gemini" else f"_{EMBEDDING_BACKEND}"
+
+# Vectors are partitioned per user (see vector_partitions); v4 were single global collections
+COLLECTION_VERSION = "v5"
+LEGACY_RESUME_COLLECTION = "resume_embeddings_v4"
+LEGACY_CHAT_COLLECTION = "chat_history_embeddings_v4"
+LEGACY_COLLECTIONS = (LEGACY_RESUME_COLLECTION, LEGACY_CHAT_COLLECTION)
+# Set on a legacy collection's metadata once its vectors are copied into the partitions
+MIGRATED_MARKER = "migrated_to"
+resume_collections = PartitionedCollection(client, f"resume_embeddings{_BACKEND_SUFFIX}_{COLLECTION_VERSION}", embedding_function)
+chat_collections = PartitionedCollection(client, f"chat_history_embeddings{_BACKEND_SUFFIX}_{COLLECTION_VERSION}", embedding_function)
+
+# Current-generation partitions of *every* backend (gemini has no suffix, e.g. _local_v5_u12),
+# so switching EMBEDDING_BACKEND never makes the other backend's data look unused
+_LIVE_COLLECTION_RE = re.compile(
+    rf"^(resume_embeddings|chat_history_embeddings)(_[a-z0-9]+)?_{COLLECTION_VERSION}_[ub].+$"
+)
+
+def is_live_collection(name: str) -> bool:
+    return bool(_LIVE_COLLECTION_RE.match(name))
+
+# Coalesces embeddings requested concurrently by chat/upload handlers into batched API calls
+embedding_batcher = EmbeddingBatcher(embedding_function)
+
+async def embed_text_async(text: str):
+    """
+    Embed a text once so the vector can be reused across every add/query in a request,
+    sharing a batched API call with concurrent requests.
+    """
+    if not embedding_function.remote:
+        # Local embeddings are cheap: no batching window, no network round trip
+        return embedding_function([text])[0]
+    return await embedding_batcher.embed(text)
+
+async def embed_texts_async(texts: list):
+    if not embedding_function.remote:
+        return await asyncio.to_thread(embedding_function, texts)
+    return await embedding_batcher.embed_many(texts)
+
+def _query_input(query_text: str, query_embedding=None):
+    # Prefer a precomputed vector so Chroma doesn't call the embedding API again
+    if query_embedding is not None:
+        return {"query_embeddings": [query_embedding]}
+    return {"query_texts": [query_text]}
+
+def add_resume_to_vector_store(resume_text: str, user_id: str, resume_id: str, chunks: list = None, embeddings=None):
+    """
+    Index a resume as section-aware chunks, one Chroma entry per chunk.
+    Pass `chunks`/`embeddings` when the caller already chunked and batch-embedded the text.
+    """
+    if chunks is None:
+        chunks = chunk_resume(resume_text)
+    resume_collection = resume_collections.for_user(user_id)
+    # Drop any previous index of this resume so a re-run ingestion job stays idempotent
+    resume_collection.delete(where={"resume_id": resume_id})
+    if not chunks:
+        return
     resume_collection.add(
-        documents=[resume_text],
-        metadatas=[{"user_id": user_id, "resume_id": resume_id}],
-        ids=[resume_id]
+        documents=[chunk["document"] for chunk in chunks],
+        embeddings=embeddings,
+        metadatas=[
+            {"user_id": user_id, "resume_id": resume_id, "section": chunk["section"], "chunk_index": chunk["chunk_index"]}
+            for chunk in chunks
+        ],
+        ids=[f"{resume_id}:{chunk['chunk_index']}" for chunk in chunks]
     )
 
-def query_resume_context(query_text: str, user_id: str, resume_id: str = None, n_results: int = 2):
-    where_filter = {"user_id": user_id}
-    if resume_id:
-        where_filter = {
-            "$and": [
-                {"user_id": user_id},
-                {"resume_id": str(resume_id)}
-            ]
-        }
-        
+def _where(*clauses):
+    clauses = [clause for clause in clauses if clause]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def _documents(results) -> list:
+    return results['documents'][0] if results['documents'] else []
+
+def query_resume_context(query_text: str, user_id: str, resume_id: str = None, n_results: int = RESUME_CONTEXT_CHUNKS,
+                         query_embedding=None):
+    resume_collection = resume_collections.for_user(user_id, create=False)
+    if resume_collection is None:
+        return []
+    where_filter = _where(resume_collections.user_filter(user_id), {"resume_id": str(resume_id)} if resume_id else None)
     results = resume_collection.query(
-        query_texts=[query_text],
+        **_query_input(query_text, query_embedding),
         n_results=n_results,
         where=where_filter
     )
-    return results['documents'][0] if results['documents'] else []
+    return _documents(results)
 
-def add_chat_to_vector_store(chat_text: str, user_id: str, session_id: str, message_id: str):
-    chat_collection.add(
+def add_chat_to_vector_store(chat_text: str, user_id: str, session_id: str, message_id: str,
+                             embedding=None):
+    chat_collections.for_user(user_id).add(
         documents=[chat_text],
+        embeddings=[embedding] if embedding is not None else None,
         metadatas=[{"user_id": user_id, "session_id": session_id}],
         ids=[message_id]
     )
 
-def query_chat_history(query_text: str, session_id: str, n_results: int = 5):
-    results = chat_collection.query(
-        query_texts=[query_text],
-        n_results=n_results,
-        where={"session_id": session_id}
-    )
-    return results['documents'][0] if results['documents'] else []
+def delete_session_chats(user_id: str, session_ids: list):
+    """Remove the chat vectors of deleted sessions, a batch of sessions per call."""
+    chat_collection = chat_collections.for_user(user_id, create=False)
+    if chat_collection is None:
+        return
+    session_ids = [str(session_id) for session_id in session_ids]
+    for start in range(0, len(session_ids), CHROMA_DELETE_BATCH_SIZE):
+        batch = session_ids[start:start + CHROMA_DELETE_BATCH_SIZE]
+        chat_collection.delete(where=_where(chat_collections.user_filter(user_id), {"session_id": {"$in": batch}}))
 
-def query_user_chat_history(query_text: str, user_id: str, n_results: int = 10):
-    """Query chat history across ALL sessions for a user — gives cross-session awareness."""
+def query_user_chat_history(query_text: str, user_id: str, n_results: int = 10, query_embedding=None,
+                            exclude_session_id: str = None):
+    """
+    Query chat history across ALL sessions for a user — gives cross-session awareness.
+    Pass exclude_session_id to skip the current session (the prompt carries its summary and recent turns).
+    """
+    chat_collection = chat_collections.for_user(user_id, create=False)
+    if chat_collection is None:
+        return []
     results = chat_collection.query(
-        query_texts=[query_text],
+        **_query_input(query_text, query_embedding),
         n_results=n_results,
-        where={"user_id": user_id}
+        where=_where(
+            chat_collections.user_filter(user_id),
+            {"session_id": {"$ne": exclude_session_id}} if exclude_session_id else None
+        )
     )
-    return results['documents'][0] if results['documents'] else []
+    return _documents(results)
+
+def migrate_legacy_collections(page_size: int = 500) -> dict:
+    """
+    Copy vectors from the global v4 collections into the per-user partitions
+    (embeddings are copied, not recomputed). Safe to re-run: ids are upserted.
+    Each fully copied v4 collection is marked (MIGRATED_MARKER), which is what lets
+    the vector GC's drop_unused remove it.
+    """
+    copied = {}
+    if EMBEDDING_BACKEND != "gemini":
+        # v4 holds Gemini vectors; other backends re-index from the database instead
+        return copied
+    for legacy_name, partitions in ((LEGACY_RESUME_COLLECTION, resume_collections), (LEGACY_CHAT_COLLECTION, chat_collections)):
+        try:
+            legacy = client.get_collection(name=legacy_name, embedding_function=embedding_function)
+        except NotFoundError:
+            continue
+        copied[legacy_name] = 0
+        offset = 0
+        while True:
+            page = legacy.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            offset += len(page["ids"])
+            by_user = {}
+            for i, metadata in enumerate(page["metadatas"]):
+                by_user.setdefault((metadata or {}).get("user_id"), []).append(i)
+            for user_id, rows in by_user.items():
+                if user_id is None:
+                    continue
+                partitions.for_user(user_id).upsert(
+                    ids=[page["ids"][i] for i in rows],
+                    embeddings=[page["embeddings"][i] for i in rows],
+                    documents=[page["documents"][i] for i in rows],
+                    metadatas=[page["metadatas"][i] for i in rows]
+                )
+                copied[legacy_name] += len(rows)
+        legacy.modify(metadata={**(legacy.metadata or {}), MIGRATED_MARKER: COLLECTION_VERSION,
+                                "migrated_at": datetime.utcnow().isoformat()})
+    return copied
@@ -0,0 +1,164 @@
+import os
+import re
+from .embedding_cache import normalize_text
+
+# Per-section prompt budgets, in estimated tokens (see estimate_tokens)
+CONTEXT_BUDGET_PROFILE = int(os.getenv("CONTEXT_BUDGET_PROFILE", "300"))
+CONTEXT_BUDGET_RESUME = int(os.getenv("CONTEXT_BUDGET_RESUME", "800"))
+CONTEXT_BUDGET_HISTORY = int(os.getenv("CONTEXT_BUDGET_HISTORY", "600"))
+CONTEXT_BUDGET_SESSION_SUMMARY = int(os.getenv("CONTEXT_BUDGET_SESSION_SUMMARY", "300"))
+CONTEXT_BUDGET_SUMMARIES = int(os.getenv("CONTEXT_BUDGET_SUMMARIES", "400"))
+CONTEXT_BUDGET_CROSS_SESSION = int(os.getenv("CONTEXT_BUDGET_CROSS_SESSION", "600"))
+# Word-set overlap (Jaccard) at which two documents count as the same text
+CONTEXT_DEDUPE_SIMILARITY = float(os.getenv("CONTEXT_DEDUPE_SIMILARITY", "0.85"))
+
+# Gemini averages roughly four characters per token for English prose
+_CHARS_PER_TOKEN = 4
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; close enough for budgeting without calling count_tokens."""
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN if text else 0
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    limit = max_tokens * _CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:max(limit - 1, 0)].rsplit(" ", 1)[0]
+    return cut + "…" if cut else ""
+
+
+class _Seen:
+    """Documents already placed in the prompt, matched exactly or by word overlap."""
+
+    def __init__(self, similarity: float):
+        self.similarity = similarity
+        self.keys = set()
+        self.word_sets = []
+
+    def is_duplicate(self, text: str) -> bool:
+        key = normalize_text(text).lower()
+        if key in self.keys:
+            return True
+        words = set(_WORD_RE.findall(key))
+        if words and self.similarity < 1:
+            for other in self.word_sets:
+                if len(words & other) / len(words | other) >= self.similarity:
+                    return True
+        return False
+
+    def add(self, text: str):
+        key = normalize_text(text).lower()
+        self.keys.add(key)
+        words = set(_WORD_RE.findall(key))
+        if words:
+            self.word_sets.append(words)
+
+
+def _fill(docs: list, budget: int, seen: _Seen) -> list:
+    """
+    Greedily keep documents in rank order (Chroma returns nearest first) until the
+    budget is spent. A document that doesn't fit is skipped so a shorter, lower-ranked
+    one can still use the space; only the top document is ever truncated.
+    """
+    kept, used = [], 0
+    for doc in docs or []:
+        if not doc or not doc.strip() or seen.is_duplicate(doc):
+            continue
+        cost = estimate_tokens(doc)
+        if used + cost > budget:
+            if kept:
+                continue
+            doc = _truncate(doc, budget)
+            if not doc:
+                continue
+            cost = estimate_tokens(doc)
+        seen.add(doc)
+        kept.append(doc)
+        used += cost
+    return kept
+
+
+def _fill_recent(turns: list, budget: int, seen: _Seen) -> list:
+    """
+    Keep the newest turns verbatim, walking back until one doesn't fit, so the section
+    is always a contiguous tail of the conversation. Turns are not de-duplicated (a
+    repeated question is still part of the conversation) but are marked as seen.
+    """
+    kept, used = [], 0
+    for turn in reversed(turns or []):
+        if not turn or not turn.strip():
+            continue
+        cost = estimate_tokens(turn)
+        if used + cost > budget:
+            if not kept:
+                # A single oversized newest turn is cut rather than dropped
+                turn = _truncate(turn, budget)
+                if turn:
+                    seen.add(turn)
+                    kept.append(turn)
+            break
+        seen.add(turn)
+        kept.append(turn)
+        used += cost
+    return kept[::-1]
+
+
+def _fill_summaries(lines: list, budget: int) -> list:
+    # Newest sessions matter most: take from the end, then restore chronological order
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return kept[::-1]
+
+
+def build_chat_context(question: str, history_context: list = None, resume_context: list = None,
+                       cross_session_context: list = None, user_profile: str = "",
+                       session_summaries: list = None, session_summary: str = "",
+                       budgets: dict = None, similarity: float = CONTEXT_DEDUPE_SIMILARITY) -> dict:
+    """
+    Rank, de-duplicate and trim every context source for the chat prompt.
+    Sources are filled in priority order (current session, resume, past sessions),
+    so a document retrieved by more than one query is kept only where it ranks first,
+    and the question itself (already stored as a chat vector) is never echoed back.
+    `history_context` is the session's recent turns, oldest first: the newest are kept,
+    without gaps.
+    Returns the kept documents per section plus their estimated token counts.
+    """
+    budgets = {
+        "profile": CONTEXT_BUDGET_PROFILE,
+        "resume": CONTEXT_BUDGET_RESUME,
+        "history": CONTEXT_BUDGET_HISTORY,
+        "session_summary": CONTEXT_BUDGET_SESSION_SUMMARY,
+        "summaries": CONTEXT_BUDGET_SUMMARIES,
+        "cross_session": CONTEXT_BUDGET_CROSS_SESSION,
+        **(budgets or {}),
+    }
+    seen = _Seen(similarity)
+    history = _fill_recent(history_context, budgets["history"], seen)
+    # Only retrieved sections must not echo the question back
+    seen.add(question)
+    resume = _fill(resume_context, budgets["resume"], seen)
+    cross_session = _fill(cross_session_context, budgets["cross_session"], seen)
+    summaries = _fill_summaries([s for s in session_summaries or [] if s], budgets["summaries"])
+    profile = _truncate(user_profile or "", budgets["profile"])
+    session_summary = _truncate(session_summary or "", budgets["session_summary"])
+    sections = {
+        "profile": profile,
+        "resume": resume,
+        "history": history,
+        "session_summary": session_summary,
+        "summaries": summaries,
+        "cross_session": cross_session,
+    }
+    sections["tokens"] = {
+        name: estimate_tokens(value) if isinstance(value, str) else sum(estimate_tokens(d) for d in value)
+        for name, value in sections.items()
+    }
+    return sections
@@ -0,0 +1,118 @@
+import os
+import re
+import zlib
+import chromadb
+import google.generativeai as genai
+import numpy as np
+from .embedding_cache import embedding_cache
+
+# "gemini" (remote API, default) or "local" (hashed n-gram projection on the CPU, no network)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "gemini").lower()
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "512"))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class GeminiEmbeddingFunction(chromadb.EmbeddingFunction):
+    """Gemini embedding API, behind the two-tier embedding cache."""
+
+    remote = True
+
+    def __init__(self, model_name="models/gemini-embedding-001", output_dimensionality=None):
+        self.model_name = model_name
+        self.output_dimensionality = output_dimensionality
+        self._configured = False
+    def _embed_batch(self, texts):
+        # Configure on first use so importing the app never needs an API key
+        if not self._configured:
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            self._configured = True
+        kwargs = {}
+        if self.output_dimensionality:
+            kwargs["output_dimensionality"] = self.output_dimensionality
+        response = genai.embed_content(model=self.model_name, content=texts, **kwargs)
+        return response['embedding']
+    def _embed_cached(self, texts):
+        # Content-addressed cache: only texts never embedded before reach the API
+        return embedding_cache.get_or_compute(self.model_name, self.output_dimensionality, texts, self._embed_batch)
+    def __call__(self, input):
+        # input is a list of strings
+        if isinstance(input, str):
+            input = [input]
+        return self._embed_cached(list(input))
+    def embed_query(self, text=None, **kwargs):
+        # Handle case where Chroma calls with 'input' keyword
+        content = text if text is not None else kwargs.get("input")
+        if content is None:
+            raise ValueError("No text provided for embedding query")
+        if isinstance(content, str):
+            return self._embed_cached([content])[0]
+        return self._embed_cached(list(content))
+    def name(self):
+        return "gemini_embeddings"
+
+
+class LocalHashEmbeddingFunction(chromadb.EmbeddingFunction):
+    """
+    Offline embeddings: word unigrams/bigrams and character n-grams hashed into a
+    fixed number of signed buckets (the "hashing trick"), log-scaled and L2-normalised.
+    Cosine similarity then tracks shared vocabulary and spelling, which is enough for
+    chat-history and resume-section lookups, at microseconds per text and no network.
+    """
+
+    remote = False
+
+    def __init__(self, dim: int = LOCAL_EMBEDDING_DIM, char_ngrams=(3, 4, 5)):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.model_name = f"local-hash-ngram-{dim}"
+        self.output_dimensionality = dim
+
+    def _features(self, text: str) -> list:
+        words = _WORD_RE.findall(text.lower())
+        features = [f"w:{w}" for w in words]
+        features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            for n in self.char_ngrams:
+                features += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+        return features
+
+    def _embed_one(self, text: str) -> list:
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in self._features(text)), dtype=np.uint32
+        )
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if hashes.size:
+            # Low bits pick the bucket, the top bit the sign (keeps collisions unbiased)
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(vector, hashes % self.dim, signs)
+            vector = np.sign(vector) * np.log1p(np.abs(vector))
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector /= norm
+        return vector.tolist()
+
+    def __call__(self, input):
+        if isinstance(input, str):
+            input = [input]
+        return [self._embed_one(text) for text in input]
+
+    def embed_query(self, text=None, **kwargs):
+        content = text if text is not None else kwargs.get("input")
+        if content is None:
+            raise ValueError("No text provided for embedding query")
+        if isinstance(content, str):
+            return self._embed_one(content)
+        return self(list(content))
+
+    def name(self):
+        return "local_hash_ngram"
+
+
+def create_embedding_function(backend: str = EMBEDDING_BACKEND):
+    if backend == "gemini":
+        return GeminiEmbeddingFunction()
+    if backend == "local":
+        return LocalHashEmbeddingFunction()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r} (expected 'gemini' or 'local')")
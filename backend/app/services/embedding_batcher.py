@@ -0,0 +1,85 @@
+import asyncio
+import os
+
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "10"))
+# Gemini's batch embedding endpoint accepts at most 100 texts per call
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "100"))
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces embedding requests from concurrent handlers into one batched call.
+
+    Requests are collected for up to `window_ms` (or until `max_batch_size`
+    texts are queued) and then sent through `embed_fn(texts)` in a worker
+    thread. Each caller gets back only its own vector.
+    """
+
+    def __init__(self, embed_fn, window_ms: float = EMBED_BATCH_WINDOW_MS, max_batch_size: int = EMBED_BATCH_MAX_SIZE):
+        self.embed_fn = embed_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending = []  # (text, future)
+        self._timer = None
+        # The loop only keeps weak references to tasks; hold in-flight dispatches here
+        self._tasks = set()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+
+    async def embed(self, text: str) -> list:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    async def embed_many(self, texts: list) -> list:
+        return list(await asyncio.gather(*(self.embed(t) for t in texts)))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        self.batches += 1
+        try:
+            vectors = await asyncio.to_thread(self.embed_fn, [text for text, _ in batch])
+            if vectors is None or len(vectors) != len(batch):
+                # Can't tell which text a short reply skipped, so no vector is trusted;
+                # failing every caller beats leaving some awaiting forever
+                raise RuntimeError(
+                    f"Embedding backend returned {0 if vectors is None else len(vectors)} vectors for {len(batch)} texts"
+                )
+        except Exception as e:
+            self.errors += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "errors": self.errors,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "pending": len(self._pending),
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+        }
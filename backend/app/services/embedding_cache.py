@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+# Always resolve to project_root/data regardless of working directory
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent  # backend/app/services -> root
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", str(PROJECT_ROOT / "data" / "embedding_cache.sqlite3"))
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "64"))
+
+# Rough per-entry bookkeeping cost (key string, OrderedDict node, array header)
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC unicode, collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_key(model_name: str, dimensionality, text: str) -> str:
+    raw = f"{model_name}\x1f{dimensionality or 'default'}\x1f{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier cache: in-memory LRU bounded by bytes, backed by a local SQLite store."""
+
+    def __init__(self, db_path: str = EMBEDDING_CACHE_PATH, max_bytes: int = int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()  # key -> array('f')
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT, dimensionality INTEGER, vector BLOB, created_at REAL)"
+        )
+        self._conn.commit()
+
+    def _remember(self, key: str, vector: array):
+        # Caller holds the lock
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = vector
+        self._memory_bytes += vector.itemsize * len(vector) + _ENTRY_OVERHEAD_BYTES
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.itemsize * len(evicted) + _ENTRY_OVERHEAD_BYTES
+            self.evictions += 1
+
+    def get_or_compute(self, model_name: str, dimensionality, texts: list, compute):
+        """
+        Return one vector per text, calling `compute(missing_texts)` once for
+        every text found in neither tier. Duplicate texts in a batch are embedded once.
+        """
+        keys = [make_key(model_name, dimensionality, t) for t in texts]
+        found = {}
+
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.memory_hits += 1
+
+            pending = [k for k in dict.fromkeys(keys) if k not in found]
+            if pending:
+                placeholders = ",".join("?" * len(pending))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", pending
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            computed = compute(list(missing.values()))
+            now = time.time()
+            with self._lock:
+                self.misses += len(missing)
+                rows = []
+                for key, values in zip(missing.keys(), computed):
+                    vector = array("f", values)
+                    found[key] = vector
+                    self._remember(key, vector)
+                    rows.append((key, model_name, dimensionality, vector.tobytes(), now))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, dimensionality, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+
+        return [found[key].tolist() for key in keys]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_max_bytes": self.max_bytes,
+                "disk_entries": disk_entries,
+            }
+
+
+embedding_cache = EmbeddingCache()
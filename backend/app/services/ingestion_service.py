@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import os
+from .. import async_crud, schemas
+from ..concurrency import run_blocking, run_async_db
+from . import parser_service, openai_service, chroma_service
+from .resume_chunker import chunk_resume
+
+# Number of resumes processed concurrently (parse -> extract -> embed)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+logger = logging.getLogger(__name__)
+
+_queue = None
+_workers = []
+
+
+async def _set_stage(job_id: int, stage: str, **fields):
+    await run_async_db(async_crud.update_ingestion_job, job_id, stage=stage, **fields)
+
+
+async def process_job(job_id: int):
+    # Claim the job atomically so a job queued twice (restart, re-upload) runs only once
+    if not await run_async_db(async_crud.transition_ingestion_job, job_id, "queued", status="running", error=None):
+        return
+    job = await run_async_db(async_crud.get_ingestion_job, job_id)
+
+    if job.resume_id is None:
+        # 1. Parse the stored upload
+        await _set_stage(job_id, "parsing")
+        parsed_text, parse_stats = await run_blocking(parser_service.parse_resume_file, job.file_path, job.filename)
+
+        # 2. Extract the structured profile used by downstream prompts
+        await _set_stage(job_id, "extracting", parse_stats=parse_stats)
+        profile = None
+        try:
+            extracted_details = await openai_service.extract_resume_details(parsed_text)
+            profile = openai_service.parse_resume_profile(extracted_details)
+        except Exception as e:
+            # Prompts fall back to the raw resume text when no profile is stored
+            logger.warning("Could not extract resume profile for job %s: %s", job_id, e)
+
+        # 3. Create the resume (and profile) only once both are ready, linked to the job in the same commit
+        await _set_stage(job_id, "saving")
+        resume_data = schemas.ResumeCreate(
+            user_id=job.user_id, file_path=job.file_path, content_hash=job.content_hash, parsed_content=parsed_text
+        )
+        resume_id = await run_async_db(async_crud.create_job_resume, job_id, resume_data, profile, stage="embedding")
+    else:
+        # Resumed after a restart: the resume row already exists, only indexing is left
+        await _set_stage(job_id, "embedding")
+        resume_id = job.resume_id
+        parsed_text = (await run_async_db(async_crud.get_resume, resume_id)).parsed_content
+
+    # 4. Store in ChromaDB as section-aware chunks, embedded in one batched call
+    chunks = chunk_resume(parsed_text)
+    chunk_embeddings = await chroma_service.embed_texts_async([chunk["document"] for chunk in chunks])
+    await run_blocking(
+        chroma_service.add_resume_to_vector_store,
+        parsed_text, str(job.user_id), str(resume_id), chunks=chunks, embeddings=chunk_embeddings
+    )
+
+    # 5. Link to session if provided
+    if job.session_id:
+        await run_async_db(async_crud.update_chat_session, job.session_id, resume_id=resume_id)
+
+    await _set_stage(job_id, "done", status="completed")
+
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await process_job(job_id)
+        except Exception as e:
+            logger.exception("Resume ingestion job %s failed", job_id)
+            try:
+                await run_async_db(async_crud.update_ingestion_job, job_id, status="failed", error=str(e))
+            except Exception as db_error:
+                logger.error("Could not record failure for job %s: %s", job_id, db_error)
+        finally:
+            _queue.task_done()
+
+
+def enqueue(job_id: int):
+    _queue.put_nowait(job_id)
+
+
+async def start_workers():
+    """Start the worker pool and re-queue jobs left unfinished by a previous process."""
+    global _queue
+    _queue = asyncio.Queue()
+    for _ in range(INGEST_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+    # Nothing runs before the workers start, so any "running" job was interrupted by a crash
+    await run_async_db(async_crud.requeue_interrupted_ingestion_jobs)
+    for job in await run_async_db(async_crud.get_queued_ingestion_jobs):
+        enqueue(job.id)
+
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,346 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from google.api_core import exceptions as google_exceptions
+
+# Gemini calls allowed in flight at once, across every endpoint and background job
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Calls allowed to wait for a slot; beyond this new calls are rejected immediately
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+# Longest a call may wait for a slot before it is shed
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "10"))
+# Per-attempt deadline (streams: until the first chunk, then between chunks)
+LLM_ATTEMPT_TIMEOUT_S = float(os.getenv("LLM_ATTEMPT_TIMEOUT_S", "30"))
+# Overall deadline per call, covering queueing, every attempt and the backoff between them
+LLM_DEADLINE_S = float(os.getenv("LLM_DEADLINE_S", "60"))
+# Retries after the first attempt for transient failures (429, 5xx, timeouts)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_MS = float(os.getenv("LLM_BACKOFF_BASE_MS", "500"))
+LLM_BACKOFF_MAX_MS = float(os.getenv("LLM_BACKOFF_MAX_MS", "8000"))
+# Consecutive transient failures that open the circuit, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+
+# Failures worth retrying: rate limits, server errors, timeouts and dropped connections
+TRANSIENT_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+class LLMUnavailableError(Exception):
+    """The LLM can't serve this call right now; the API answers 503 with Retry-After."""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMOverloadedError(LLMUnavailableError):
+    """Shed because every slot is busy and the queue is full or too slow."""
+
+
+class LLMCircuitOpenError(LLMUnavailableError):
+    """Shed without calling the LLM because recent calls kept failing."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive transient failures;
+    open -> half-open after `reset_timeout` seconds, letting one trial call through;
+    the trial's outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET_S):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == "open" and self.retry_after() <= 0:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_running = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def release(self):
+        # A trial that ended without a verdict (non-transient error, cancellation)
+        self._trial_running = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "retry_after_s": round(self.retry_after(), 1) if self.state == "open" else 0,
+        }
+
+
+class LLMGateway:
+    """
+    Shared front door for every LLM call. Wraps a provider (see llm_providers) with
+    the same generate/stream interface and adds a global concurrency cap with a
+    bounded FIFO queue, per-attempt and overall deadlines, retries with full-jitter
+    exponential backoff for transient errors, and a circuit breaker. Calls that
+    can't be served raise LLMUnavailableError instead of piling up.
+    """
+
+    def __init__(self, provider, max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT_S, attempt_timeout: float = LLM_ATTEMPT_TIMEOUT_S,
+                 deadline: float = LLM_DEADLINE_S, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base_ms: float = LLM_BACKOFF_BASE_MS, backoff_max_ms: float = LLM_BACKOFF_MAX_MS,
+                 breaker: CircuitBreaker = None):
+        self.provider = provider
+        self.name = provider.name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base_ms / 1000
+        self.backoff_max = backoff_max_ms / 1000
+        self.breaker = breaker or CircuitBreaker()
+        self.in_flight = 0
+        self._waiters = deque()  # futures of calls waiting for a slot, oldest first
+        self.peak_in_flight = 0
+        self.peak_waiting = 0
+        self.calls = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.attempts = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.rejected_queue_full = 0
+        self.rejected_queue_timeout = 0
+        self.rejected_circuit_open = 0
+        self.total_latency = 0.0
+        self.total_queue_wait = 0.0
+
+    # --- concurrency slots ---------------------------------------------------
+
+    async def _acquire(self, timeout: float):
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self._take_slot()
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise LLMOverloadedError("LLM queue is full", retry_after=1.0)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.peak_waiting = max(self.peak_waiting, len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                self._release()  # The slot was handed over just as this call gave up
+            else:
+                future.cancel()
+                if future in self._waiters:
+                    self._waiters.remove(future)
+            if isinstance(e, TimeoutError):
+                self.rejected_queue_timeout += 1
+                raise LLMOverloadedError("Timed out waiting for an LLM slot", retry_after=1.0) from None
+            raise
+        finally:
+            self.total_queue_wait += time.monotonic() - started
+
+    def _take_slot(self):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _release(self):
+        # Hand the slot straight to the oldest live waiter, so in_flight never exceeds the cap
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    # --- retries and circuit -------------------------------------------------
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            self.rejected_circuit_open += 1
+            raise LLMCircuitOpenError(
+                "LLM circuit is open after repeated failures", retry_after=self.breaker.retry_after() or 1.0
+            )
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)] spreads retries from a burst
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _retry_or_raise(self, error: Exception, attempt: int, deadline_at: float):
+        """Record a transient failure, then sleep before the next attempt or give up."""
+        self.breaker.record_failure()
+        if isinstance(error, TimeoutError):
+            self.timeouts += 1
+        delay = self._backoff(attempt)
+        if attempt >= self.max_retries or time.monotonic() + delay >= deadline_at or self.breaker.state == "open":
+            self.failed += 1
+            raise LLMUnavailableError(
+                f"LLM call failed after {attempt + 1} attempt(s): {str(error) or type(error).__name__}",
+                retry_after=self.breaker.retry_after() or 1.0
+            ) from error
+        self.retries += 1
+        await asyncio.sleep(delay)
+
+    def _remaining(self, deadline_at: float, cap: float) -> float:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            self.timeouts += 1
+            raise LLMUnavailableError("LLM call deadline exceeded", retry_after=1.0)
+        return min(remaining, cap)
+
+    async def generate(self, prompt: str, task: str = None) -> str:
+        self.calls += 1
+        started = time.monotonic()
+        deadline_at = started + self.deadline
+        attempt = 0
+        while True:
+            self._check_circuit()
+            try:
+                await self._acquire(self._remaining(deadline_at, self.queue_timeout))
+            except BaseException:
+                self.breaker.release()
+                raise
+            try:
+                self.attempts += 1
+                text = await asyncio.wait_for(
+                    self.provider.generate(prompt, task=task), self._remaining(deadline_at, self.attempt_timeout)
+                )
+            except TRANSIENT_ERRORS as e:
+                error = e
+            except BaseException:
+                self.failed += 1
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                self.succeeded += 1
+                self.total_latency += time.monotonic() - started
+                return text
+            finally:
+                self._release()
+            await self._retry_or_raise(error, attempt, deadline_at)
+            attempt += 1
+
+    async def stream(self, prompt: str, task: str = None):
+        """
+        Streaming calls hold their slot until the last chunk. Only the wait for the
+        first chunk is retried; a failure after text has been sent ends the stream.
+        """
+        self.calls += 1
+        started = time.monotonic()
+        deadline_at = started + self.deadline
+        attempt = 0
+        while True:
+            self._check_circuit()
+            try:
+                await self._acquire(self._remaining(deadline_at, self.queue_timeout))
+            except BaseException:
+                self.breaker.release()
+                raise
+            chunks = self.provider.stream(prompt, task=task)
+            try:
+                self.attempts += 1
+                first = await asyncio.wait_for(
+                    anext(chunks, None), self._remaining(deadline_at, self.attempt_timeout)
+                )
+            except TRANSIENT_ERRORS as e:
+                await chunks.aclose()
+                self._release()
+                await self._retry_or_raise(e, attempt, deadline_at)
+                attempt += 1
+                continue
+            except BaseException:
+                await chunks.aclose()
+                self._release()
+                self.failed += 1
+                self.breaker.release()
+                raise
+            break
+
+        try:
+            if first is not None:
+                yield first
+                while (text := await asyncio.wait_for(anext(chunks, None), self.attempt_timeout)) is not None:
+                    yield text
+        except TRANSIENT_ERRORS as e:
+            self.breaker.record_failure()
+            self.failed += 1
+            if isinstance(e, TimeoutError):
+                self.timeouts += 1
+            raise LLMUnavailableError(f"LLM stream interrupted: {str(e) or type(e).__name__}", retry_after=1.0) from e
+        except BaseException:
+            self.failed += 1
+            self.breaker.release()
+            raise
+        else:
+            self.breaker.record_success()
+            self.succeeded += 1
+            self.total_latency += time.monotonic() - started
+        finally:
+            await chunks.aclose()
+            self._release()
+
+    def stats(self) -> dict:
+        finished = self.succeeded
+        return {
+            "provider": self.name,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": sum(1 for future in self._waiters if not future.done()),
+            "peak_in_flight": self.peak_in_flight,
+            "peak_queue_depth": self.peak_waiting,
+            "calls": self.calls,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "rejected": {
+                "queue_full": self.rejected_queue_full,
+                "queue_timeout": self.rejected_queue_timeout,
+                "circuit_open": self.rejected_circuit_open,
+            },
+            "avg_latency_ms": round(self.total_latency / finished * 1000, 1) if finished else 0,
+            "avg_queue_wait_ms": round(self.total_queue_wait / self.attempts * 1000, 1) if self.attempts else 0,
+            "circuit": self.breaker.stats(),
+        }
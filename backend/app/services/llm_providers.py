@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+# "gemini" (real API, default) or "fake" (local stand-in for load tests and offline runs)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "models/gemini-flash-latest")
+# HTTP timeout inside the SDK, so a worker thread abandoned by the gateway deadline still ends
+GEMINI_REQUEST_TIMEOUT_S = float(os.getenv("GEMINI_REQUEST_TIMEOUT_S", "60"))
+
+# Fake provider: latency and output size are log-normal (median, sigma), seeded per prompt
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "800"))
+LLM_FAKE_LATENCY_SIGMA = float(os.getenv("LLM_FAKE_LATENCY_SIGMA", "0.5"))
+LLM_FAKE_FIRST_TOKEN_MS = float(os.getenv("LLM_FAKE_FIRST_TOKEN_MS", "250"))
+LLM_FAKE_OUTPUT_WORDS = int(os.getenv("LLM_FAKE_OUTPUT_WORDS", "150"))
+LLM_FAKE_OUTPUT_SIGMA = float(os.getenv("LLM_FAKE_OUTPUT_SIGMA", "0.4"))
+LLM_FAKE_SEED = os.getenv("LLM_FAKE_SEED", "0")
+# Fraction of fake calls failing with a 503, to exercise retries and the circuit breaker
+LLM_FAKE_ERROR_RATE = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+
+
+def _next_chunk_text(chunks):
+    # Runs in a worker thread: pulls the next streamed chunk from Gemini
+    for chunk in chunks:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. safety metadata) carry nothing to forward
+            continue
+        if text:
+            return text
+    return None
+
+
+class GeminiProvider:
+    """Google Gemini via the google.generativeai SDK (blocking calls run in a thread)."""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str = GEMINI_MODEL_NAME, request_timeout: float = GEMINI_REQUEST_TIMEOUT_S):
+        self.model_name = model_name
+        self.request_options = {"timeout": request_timeout}
+        self._model = None
+
+    def _get_model(self):
+        # Created on first use so importing the app needs neither an API key nor the network
+        if self._model is None:
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, prompt: str, task: str = None) -> str:
+        response = await asyncio.to_thread(
+            self._get_model().generate_content, prompt, request_options=self.request_options
+        )
+        return response.text
+
+    async def stream(self, prompt: str, task: str = None):
+        response = await asyncio.to_thread(
+            self._get_model().generate_content, prompt, stream=True, request_options=self.request_options
+        )
+        chunks = iter(response)
+        while True:
+            text = await asyncio.to_thread(_next_chunk_text, chunks)
+            if text is None:
+                break
+            yield text
+
+
+_FILLER = (
+    "focus on building projects that show measurable impact and keep learning the tools "
+    "your target role uses every day while growing your network and portfolio"
+).split()
+
+
+class FakeProvider:
+    """
+    Deterministic stand-in for capacity planning: no network, no cost. Each prompt
+    seeds its own RNG, so a given prompt always gets the same latency and text.
+    `task` selects a response shaped like the real one (JSON for structured calls).
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = LLM_FAKE_LATENCY_MS, latency_sigma: float = LLM_FAKE_LATENCY_SIGMA,
+                 first_token_ms: float = LLM_FAKE_FIRST_TOKEN_MS, output_words: int = LLM_FAKE_OUTPUT_WORDS,
+                 output_sigma: float = LLM_FAKE_OUTPUT_SIGMA, seed: str = LLM_FAKE_SEED,
+                 error_rate: float = LLM_FAKE_ERROR_RATE):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.first_token_ms = first_token_ms
+        self.output_words = output_words
+        self.output_sigma = output_sigma
+        self.seed = seed
+        self.error_rate = error_rate
+        # Failures are drawn from their own stream so a retried prompt can succeed
+        self._errors = random.Random(f"{seed}\x1ferrors")
+
+    def _rng(self, prompt: str) -> random.Random:
+        return random.Random(hashlib.sha256(f"{self.seed}\x1f{prompt}".encode("utf-8")).hexdigest())
+
+    @staticmethod
+    def _lognormal(rng: random.Random, median: float, sigma: float) -> float:
+        return rng.lognormvariate(math.log(max(median, 1e-6)), sigma) if sigma > 0 else median
+
+    def _words(self, rng: random.Random, scale: float = 1.0) -> str:
+        count = max(1, int(self._lognormal(rng, self.output_words * scale, self.output_sigma)))
+        return " ".join(rng.choice(_FILLER) for _ in range(count))
+
+    def _respond(self, rng: random.Random, task: str) -> str:
+        if task == "resume_profile":
+            return json.dumps({
+                "skills": ["Python", "SQL", "Communication"],
+                "experience_level": rng.choice(["Junior", "Mid", "Senior"]),
+                "years_of_experience": rng.randint(0, 15),
+                "education": "Bachelor's degree",
+            })
+        if task == "career_paths":
+            return json.dumps([
+                {
+                    "Career Name": f"Career option {i}",
+                    "Why it is suitable": self._words(rng, 0.2),
+                    "Estimated Salary Range": f"${rng.randint(50, 90)}k - ${rng.randint(95, 160)}k",
+                }
+                for i in range(1, 4)
+            ])
+        if task == "roadmap":
+            return json.dumps([
+                {
+                    "id": i,
+                    "step": f"Step {i}",
+                    "description": self._words(rng, 0.2),
+                    "difficulty": rng.choice(["Beginner", "Intermediate", "Advanced"]),
+                    "estimated_time": f"{rng.randint(1, 8)} weeks",
+                    "status": "pending",
+                    "resources": [
+                        {"title": f"Resource {i}.{j}", "url": "https://example.com", "type": "article"}
+                        for j in range(1, 4)
+                    ],
+                }
+                for i in range(1, 6)
+            ])
+        if task == "skills":
+            return json.dumps({
+                "Skill": ["Python", "SQL", "Git", "Docker", "Communication"],
+                "Score": [rng.randint(20, 95) for _ in range(5)],
+            })
+        if task == "session_summary":
+            return self._words(rng, 0.6)
+        return self._words(rng)
+
+    def _maybe_fail(self):
+        if self.error_rate > 0 and self._errors.random() < self.error_rate:
+            raise google_exceptions.ServiceUnavailable("fake provider: injected failure")
+
+    async def generate(self, prompt: str, task: str = None) -> str:
+        rng = self._rng(prompt)
+        latency = self._lognormal(rng, self.latency_ms, self.latency_sigma)
+        text = self._respond(rng, task)
+        await asyncio.sleep(latency / 1000)
+        self._maybe_fail()
+        return text
+
+    async def stream(self, prompt: str, task: str = None):
+        rng = self._rng(prompt)
+        latency = self._lognormal(rng, self.latency_ms, self.latency_sigma)
+        words = self._respond(rng, task).split(" ")
+        chunks = [" ".join(words[i:i + 8]) + " " for i in range(0, len(words), 8)]
+        first_token = min(self.first_token_ms, latency)
+        await asyncio.sleep(first_token / 1000)
+        self._maybe_fail()
+        gap = (latency - first_token) / 1000 / max(len(chunks) - 1, 1)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(gap)
+            yield chunk
+
+
+def create_provider(name: str = LLM_PROVIDER):
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "fake":
+        return FakeProvider()
+    raise ValueError(f"Unknown LLM_PROVIDER {name!r} (expected 'gemini' or 'fake')")
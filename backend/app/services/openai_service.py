@@ -1,14 +1,13 @@
-import google.generativeai as genai
 from langchain_core.prompts import PromptTemplate
-import os
 import json
-import asyncio
+import re
+from .context_builder import build_chat_context
+from .llm_gateway import LLMGateway
+from .llm_providers import create_provider
 
-api_key = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=api_key)
-
-# Using models/gemini-flash-latest which is confirmed available in this environment
-model = genai.GenerativeModel('models/gemini-flash-latest')
+# LLM backend chosen by LLM_PROVIDER (Gemini by default, "fake" for load tests / offline runs),
+# behind the shared gateway (concurrency cap, deadlines, retries, circuit breaker)
+provider = LLMGateway(create_provider())
 
 async def extract_resume_details(text_content: str):
     prompt_template = """
@@ -21,12 +20,58 @@ async def extract_resume_details(text_content: str):
     Resume Text:
     {text}
     
-    Return the result as a valid JSON object.
+    Return the result as a valid JSON object with keys:
+    - "skills": list of strings
+    - "experience_level": "Junior", "Mid", or "Senior"
+    - "years_of_experience": number
+    - "education": string
     """
     prompt = prompt_template.format(text=text_content)
-    # Using loop.run_in_executor since genai is synchronous or use to_thread in 3.9+
-    response = await asyncio.to_thread(model.generate_content, prompt)
-    return response.text
+    return await provider.generate(prompt, task="resume_profile")
+
+def parse_resume_profile(details_text: str) -> dict:
+    """Normalize the JSON returned by extract_resume_details into ResumeProfile fields."""
+    # Clean potential markdown
+    if "```json" in details_text:
+        details_text = details_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in details_text:
+        details_text = details_text.split("```")[1].split("```")[0].strip()
+    
+    # Tolerate "Skills"/"Years of Experience" style keys as well as the requested snake_case ones
+    data = {str(k).strip().lower().replace(" ", "_"): v for k, v in json.loads(details_text).items()}
+    
+    skills = data.get("skills") or []
+    if isinstance(skills, str):
+        skills = [skill.strip() for skill in skills.split(",") if skill.strip()]
+    
+    years_match = re.search(r"\d+(\.\d+)?", str(data.get("years_of_experience", "")))
+    
+    education = data.get("education")
+    if isinstance(education, list):
+        education = "; ".join(str(item) for item in education)
+    
+    return {
+        "skills": [str(skill) for skill in skills],
+        "experience_level": str(data.get("experience_level") or "") or None,
+        "years_experience": float(years_match.group()) if years_match else None,
+        "education": str(education) if education else None,
+    }
+
+def format_resume_profile(profile) -> str:
+    """Compact text form of a ResumeProfile, sent to prompts instead of the full resume."""
+    years = f"{profile.years_experience:g}" if profile.years_experience is not None else "Unknown"
+    return (
+        f"Skills: {', '.join(profile.skills or []) or 'Unknown'}\n"
+        f"Experience Level: {profile.experience_level or 'Unknown'}\n"
+        f"Years of Experience: {years}\n"
+        f"Education: {profile.education or 'Unknown'}"
+    )
+
+def resume_prompt_context(resume) -> str:
+    """Compact profile when one was extracted at upload, otherwise the raw resume text."""
+    if resume.profile is not None:
+        return format_resume_profile(resume.profile)
+    return resume.parsed_content
 
 async def generate_career_paths(user_skills: str, resume_content: str, experience_level: str):
     prompt_template = """
@@ -45,12 +90,11 @@ async def generate_career_paths(user_skills: str, resume_content: str, experienc
     Return the result as a JSON list of objects.
     """
     prompt = prompt_template.format(skills=user_skills, experience=experience_level, resume=resume_content)
-    response = await asyncio.to_thread(model.generate_content, prompt)
-    return response.text
+    return await provider.generate(prompt, task="career_paths")
 
-async def generate_chat_response(message: str, history_context: list, resume_context: list,
-                                   cross_session_context: list = None, user_profile: str = "",
-                                   session_summaries: str = ""):
+def _build_chat_prompt(message: str, history_context: list, resume_context: list,
+                       cross_session_context: list = None, user_profile: str = "",
+                       session_summaries: list = None, session_summary: str = ""):
     prompt_template = """
     You are a Personal AI Career Mentor. You have deep knowledge of this user from their resume and all past conversations.
     
@@ -60,7 +104,10 @@ async def generate_chat_response(message: str, history_context: list, resume_con
     === RESUME CONTEXT ===
     {resume_ctx}
     
-    === CURRENT SESSION HISTORY ===
+    === CURRENT SESSION SUMMARY ===
+    {session_summary}
+    
+    === CURRENT SESSION RECENT MESSAGES ===
     {history_ctx}
     
     === USER'S PAST SESSION SUMMARIES ===
@@ -79,20 +126,61 @@ async def generate_chat_response(message: str, history_context: list, resume_con
     - Be a helpful, encouraging, and personalized mentor. Keep it concise.
     """
     
-    resume_ctx_str = "\n".join([doc for doc in resume_context]) if resume_context else "No resume uploaded yet."
-    history_ctx_str = "\n".join([doc for doc in history_context]) if history_context else "This is the start of the conversation."
-    cross_ctx_str = "\n".join([doc for doc in cross_session_context]) if cross_session_context else "No previous sessions."
+    # De-duplicated across sources and trimmed to per-section token budgets
+    context = build_chat_context(message, history_context, resume_context, cross_session_context,
+                                 user_profile, session_summaries, session_summary)
+    resume_ctx_str = "\n".join(context["resume"]) if context["resume"] else "No resume uploaded yet."
+    history_ctx_str = "\n".join(context["history"]) if context["history"] else "This is the start of the conversation."
+    cross_ctx_str = "\n".join(context["cross_session"]) if context["cross_session"] else "No previous sessions."
     
     prompt = prompt_template.format(
-        user_profile=user_profile or "Not available",
+        user_profile=context["profile"] or "Not available",
         resume_ctx=resume_ctx_str,
+        session_summary=context["session_summary"] or "No earlier messages in this session.",
         history_ctx=history_ctx_str,
-        session_summaries=session_summaries or "No past sessions.",
+        session_summaries="\n".join(context["summaries"]) or "No past sessions.",
         cross_session_ctx=cross_ctx_str,
         question=message
     )
-    response = await asyncio.to_thread(model.generate_content, prompt)
-    return response.text
+    return prompt
+
+async def generate_chat_response(message: str, history_context: list, resume_context: list,
+                                   cross_session_context: list = None, user_profile: str = "",
+                                   session_summaries: list = None, session_summary: str = ""):
+    prompt = _build_chat_prompt(message, history_context, resume_context, cross_session_context,
+                                user_profile, session_summaries, session_summary)
+    return await provider.generate(prompt, task="chat")
+
+async def stream_chat_response(message: str, history_context: list, resume_context: list,
+                               cross_session_context: list = None, user_profile: str = "",
+                               session_summaries: list = None, session_summary: str = ""):
+    """Same prompt as generate_chat_response, but yields text chunks as Gemini produces them."""
+    prompt = _build_chat_prompt(message, history_context, resume_context, cross_session_context,
+                                user_profile, session_summaries, session_summary)
+    async for text in provider.stream(prompt, task="chat"):
+        yield text
+
+async def summarize_chat_session(previous_summary: str, transcript: str):
+    """Fold the older turns of a session into its rolling summary (see session_summarizer)."""
+    prompt_template = """
+    You maintain the running memory of a career-mentoring chat session.
+    
+    Summary so far:
+    {previous_summary}
+    
+    New messages since that summary:
+    {transcript}
+    
+    Write an updated summary of the whole session in at most 120 words. Keep the user's goals,
+    background, skills, decisions, open questions and any advice already given. Drop greetings
+    and small talk. Write plain prose in the third person ("The user ..."), no markdown.
+    """
+    prompt = prompt_template.format(previous_summary=previous_summary or "None yet.", transcript=transcript)
+    return (await provider.generate(prompt, task="session_summary")).strip()
+
+
+# Bump whenever the roadmap prompt changes so cached roadmaps are regenerated
+ROADMAP_PROMPT_VERSION = "v2"
 
 async def generate_roadmap(resume_text: str):
     prompt_template = """
@@ -116,8 +204,7 @@ async def generate_roadmap(resume_text: str):
     Return the result as a raw JSON list of objects. Do not include markdown formatting.
     """
     prompt = prompt_template.format(resume=resume_text)
-    response = await asyncio.to_thread(model.generate_content, prompt)
-    return response.text
+    return await provider.generate(prompt, task="roadmap")
 
 async def analyze_skills(resume_text: str):
     prompt_template = """
@@ -138,5 +225,4 @@ async def analyze_skills(resume_text: str):
     Do not include markdown formatting.
     """
     prompt = prompt_template.format(resume=resume_text)
-    response = await asyncio.to_thread(model.generate_content, prompt)
-    return response.text
+    return await provider.generate(prompt, task="skills")
@@ -1,18 +1,51 @@
 import PyPDF2
 import pandas as pd
-from fastapi import UploadFile
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import io
+import os
+import time
 
-async def parse_resume(file: UploadFile) -> str:
+IMAGE_PARSING_MESSAGE = "Image parsing requires OCR. Please upload a text-based format for best results."
+
+# Caps so a single oversized upload can't pin the parser
+MAX_RESUME_BYTES = int(os.getenv("MAX_RESUME_BYTES", str(10 * 1024 * 1024)))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "50"))
+# PDFs are split into page ranges of this size and extracted in a process pool
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+PDF_PARSE_PROCESSES = int(os.getenv("PDF_PARSE_PROCESSES", str(min(4, os.cpu_count() or 1))))
+
+_pdf_pool = None
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        # spawn, not fork: the parent runs threads and holds DB/Chroma handles
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_PARSE_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _pdf_pool
+
+def parse_resume_file(file_path: str, filename: str):
+    """
+    Parse a stored upload from disk. Blocking: run it off the event loop.
+    Returns (text, stats); for PDFs stats carry per-page extraction timings.
+    """
+    if os.path.getsize(file_path) > MAX_RESUME_BYTES:
+        raise ValueError(f"Resume exceeds the {MAX_RESUME_BYTES // (1024 * 1024)} MB size limit")
+    if filename.lower().endswith(".pdf"):
+        return parse_pdf(file_path)
+    with open(file_path, "rb") as f:
+        return parse_resume_bytes(filename, f.read())
+
+def parse_resume_bytes(filename: str, data: bytes):
+    if len(data) > MAX_RESUME_BYTES:
+        raise ValueError(f"Resume exceeds the {MAX_RESUME_BYTES // (1024 * 1024)} MB size limit")
     content = ""
-    filename = file.filename.lower()
+    filename = filename.lower()
 
-    if filename.endswith(".pdf"):
-        content = await parse_pdf(file)
-    elif filename.endswith(".txt"):
-        content = await parse_txt(file)
+    if filename.endswith(".txt"):
+        content = parse_txt(data)
     elif filename.endswith(".csv"):
-        content = await parse_csv(file)
+        content = parse_csv(data)
     else:
         # For images, we would need OCR or Vision API. For now, returning standard message.
         # Expanding to basic text reading if possible or erroring out.
@@ -21,21 +54,53 @@ async def parse_resume(file: UploadFile) -> str:
         # Real implementation requires pytesseract or OpenAI Vision.
         # Given "Send extracted content to OpenAI", we can send the image bytes to OpenAI Vision later if we want.
         # But for now, let's stick to text extraction logic.
-        return "Image parsing requires OCR. Please upload a text-based format for best results."
+        return IMAGE_PARSING_MESSAGE, {}
     
-    return content
+    return content, {}
 
-async def parse_pdf(file: UploadFile) -> str:
-    content = ""
-    pdf_reader = PyPDF2.PdfReader(io.BytesIO(await file.read()))
-    for page in pdf_reader.pages:
-        content += page.extract_text() + "\n"
-    return content
+def _extract_page_range(file_path: str, start: int, end: int) -> list:
+    """Extract pages [start, end) and time each one. Runs inside a pool process."""
+    reader = PyPDF2.PdfReader(file_path)
+    pages = []
+    for index in range(start, end):
+        started = time.perf_counter()
+        text = reader.pages[index].extract_text() or ""
+        pages.append((text, round((time.perf_counter() - started) * 1000, 2)))
+    return pages
+
+def parse_pdf(file_path: str):
+    """
+    Extract text from a stored PDF, fanning page ranges out to the process
+    pool. Returns (text, stats) with per-page timings in milliseconds.
+    """
+    started = time.perf_counter()
+    page_count = len(PyPDF2.PdfReader(file_path).pages)
+    pages_to_read = min(page_count, MAX_PDF_PAGES)
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, pages_to_read)) for start in range(0, pages_to_read, PDF_PAGES_PER_TASK)]
+    
+    if len(ranges) <= 1:
+        # Not worth a round trip to the pool
+        results = [_extract_page_range(file_path, start, end) for start, end in ranges]
+    else:
+        pool = _get_pdf_pool()
+        futures = [pool.submit(_extract_page_range, file_path, start, end) for start, end in ranges]
+        results = [future.result() for future in futures]
+    
+    pages = [page for chunk in results for page in chunk]
+    # Single join instead of repeated string concatenation
+    content = "".join(text + "\n" for text, _ in pages)
+    stats = {
+        "pages": page_count,
+        "pages_parsed": len(pages),
+        "truncated": page_count > pages_to_read,
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "page_timings_ms": [elapsed for _, elapsed in pages],
+    }
+    return content, stats
 
-async def parse_txt(file: UploadFile) -> str:
-    content = await file.read()
-    return content.decode("utf-8")
+def parse_txt(data: bytes) -> str:
+    return data.decode("utf-8")
 
-async def parse_csv(file: UploadFile) -> str:
-    df = pd.read_csv(io.BytesIO(await file.read()))
+def parse_csv(data: bytes) -> str:
+    df = pd.read_csv(io.BytesIO(data))
     return df.to_string()
@@ -0,0 +1,93 @@
+import os
+import re
+
+# Upper bound on characters per chunk so retrieval returns focused snippets
+RESUME_CHUNK_MAX_CHARS = int(os.getenv("RESUME_CHUNK_MAX_CHARS", "1000"))
+
+# Heading keywords -> canonical section name
+SECTION_KEYWORDS = {
+    "summary": ["summary", "profile", "objective", "about me", "professional summary"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "work history", "career history"],
+    "skills": ["skills", "technical skills", "core competencies", "competencies", "technologies", "tools"],
+    "education": ["education", "academic background", "academics", "qualifications", "certifications", "courses"],
+    "projects": ["projects", "personal projects", "academic projects", "portfolio"],
+}
+
+_HEADING_LOOKUP = {keyword: section for section, keywords in SECTION_KEYWORDS.items() for keyword in keywords}
+_HEADING_MAX_CHARS = 40
+
+
+def _heading_section(line: str):
+    """Return the canonical section if `line` looks like a section heading."""
+    candidate = line.strip().strip(":#*-_=|").strip()
+    if not candidate or len(candidate) > _HEADING_MAX_CHARS:
+        return None
+    return _HEADING_LOOKUP.get(re.sub(r"\s+", " ", candidate.lower()))
+
+
+def split_sections(text: str) -> list:
+    """Split resume text into (section, body) pairs, in document order."""
+    sections = []
+    current_section = "summary"
+    current_lines = []
+    for line in text.splitlines():
+        section = _heading_section(line)
+        if section:
+            if any(l.strip() for l in current_lines):
+                sections.append((current_section, "\n".join(current_lines).strip()))
+            current_section = section
+            current_lines = []
+        else:
+            current_lines.append(line)
+    if any(l.strip() for l in current_lines):
+        sections.append((current_section, "\n".join(current_lines).strip()))
+    return sections
+
+
+def _split_long_line(line: str, max_chars: int) -> list:
+    # Break at the last space before the limit; hard-cut only unbroken runs
+    segments = []
+    while len(line) > max_chars:
+        cut = line.rfind(" ", 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        segments.append(line[:cut].strip())
+        line = line[cut:].strip()
+    if line:
+        segments.append(line)
+    return segments
+
+
+def _bounded_pieces(body: str, max_chars: int) -> list:
+    # Greedily pack lines into pieces of at most max_chars
+    pieces = []
+    current = ""
+    for line in body.splitlines():
+        for segment in _split_long_line(line.strip(), max_chars):
+            if current and len(current) + 1 + len(segment) > max_chars:
+                pieces.append(current)
+                current = segment
+            else:
+                current = f"{current}\n{segment}" if current else segment
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_resume(text: str, max_chars: int = RESUME_CHUNK_MAX_CHARS) -> list:
+    """
+    Split a resume into section-aware chunks of at most `max_chars` characters.
+    Each chunk is a dict with "section", "chunk_index" and "document" (the
+    chunk text prefixed with its section name, which is what gets embedded;
+    the limit includes the prefix).
+    """
+    chunks = []
+    for section, body in split_sections(text or ""):
+        prefix = f"[{section.title()}]\n"
+        for piece in _bounded_pieces(body, max(max_chars - len(prefix), 1)):
+            chunks.append({
+                "section": section,
+                "chunk_index": len(chunks),
+                "document": prefix + piece,
+            })
+    return chunks
@@ -0,0 +1,70 @@
+import logging
+import os
+from .. import async_crud
+from ..concurrency import run_async_db, single_flight
+from . import openai_service
+
+# Newest messages always sent to the LLM verbatim; older ones live in the rolling summary
+SESSION_RECENT_MESSAGES = int(os.getenv("SESSION_RECENT_MESSAGES", "6"))
+# Messages beyond the verbatim window that trigger a summary refresh
+SESSION_SUMMARY_EVERY = int(os.getenv("SESSION_SUMMARY_EVERY", "10"))
+# Max messages folded in per LLM call, so a long backlog is summarized in chunks
+SESSION_SUMMARY_MAX_MESSAGES = int(os.getenv("SESSION_SUMMARY_MAX_MESSAGES", "40"))
+
+logger = logging.getLogger(__name__)
+
+_ROLE_LABELS = {"user": "User", "assistant": "Mentor"}
+
+
+def format_turn(message) -> str:
+    return f"{_ROLE_LABELS.get(message.role, message.role)}: {message.content}"
+
+
+async def load_session_memory(db, session_id: int, before_id: int = None):
+    """
+    Rolling summary plus the turns it doesn't cover yet (oldest first), which is what
+    the chat prompt sends instead of the full session. The window is capped so the
+    prompt stays bounded even if summarization falls behind.
+    """
+    session = await async_crud.get_chat_session(db, session_id)
+    if session is None:
+        return "", []
+    messages = await async_crud.get_unsummarized_chat_messages(
+        db, session_id, after_id=session.summarized_through_id, before_id=before_id,
+        limit=SESSION_RECENT_MESSAGES + SESSION_SUMMARY_EVERY
+    )
+    return session.context_summary or "", [format_turn(m) for m in messages]
+
+
+async def _load_backlog(db, session_id: int):
+    """Previous summary and the messages to fold into it, or None if below the trigger."""
+    session = await async_crud.get_chat_session(db, session_id)
+    if session is None:
+        return None
+    pending = await async_crud.count_unsummarized_chat_messages(db, session_id, after_id=session.summarized_through_id)
+    if pending < SESSION_RECENT_MESSAGES + SESSION_SUMMARY_EVERY:
+        return None
+    # Fold everything except the verbatim window, oldest first
+    messages = await async_crud.get_unsummarized_chat_messages(db, session_id, after_id=session.summarized_through_id)
+    return session.context_summary, messages[:min(pending - SESSION_RECENT_MESSAGES, SESSION_SUMMARY_MAX_MESSAGES)]
+
+
+async def summarize_session(session_id: int):
+    """Refresh the session's summary until its backlog is below the trigger (no-op if already small)."""
+    try:
+        # Separate DB sessions around the LLM call so no pooled connection is held while it runs
+        while (backlog := await run_async_db(_load_backlog, session_id)) is not None:
+            previous_summary, messages = backlog
+            summary = await openai_service.summarize_chat_session(
+                previous_summary, "\n".join(format_turn(m) for m in messages)
+            )
+            if not await run_async_db(async_crud.save_session_summary, session_id, summary, messages[-1].id):
+                break
+    except Exception as e:
+        # The prompt falls back to the capped recent window; the next message retries
+        logger.warning("Session %s summarization failed: %s", session_id, e)
+
+
+def schedule(session_id: int):
+    """Summarize in the background after a reply is stored; one run per session at a time."""
+    return single_flight(("session_summary", session_id), lambda: summarize_session(session_id))
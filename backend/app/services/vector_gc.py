@@ -0,0 +1,178 @@
+import os
+import shutil
+import sqlite3
+import uuid
+from pathlib import Path
+from sqlalchemy.orm import Session
+from .. import models
+from . import chroma_service
+
+# Vectors fetched per Chroma page / ids checked per Postgres round trip
+VECTOR_GC_PAGE_SIZE = int(os.getenv("VECTOR_GC_PAGE_SIZE", "1000"))
+
+
+def _disk_usage(path: str) -> int:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def _chat_row_id(vector_id: str, metadata: dict):
+    # Chat vectors are stored under the ChatMessage id
+    return int(vector_id) if vector_id.isdigit() else None
+
+
+def _resume_row_id(vector_id: str, metadata: dict):
+    # Resume chunks are "<resume_id>:<chunk_index>" and carry resume_id in their metadata
+    resume_id = (metadata or {}).get("resume_id") or vector_id.split(":", 1)[0]
+    return int(resume_id) if str(resume_id).isdigit() else None
+
+
+def find_orphans(db: Session, collection, model, row_id) -> tuple:
+    """
+    Page through `collection` and return (scanned, orphan_ids): vectors whose
+    Postgres row (`model.id` as returned by `row_id`) no longer exists.
+    """
+    scanned = 0
+    orphan_ids = []
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=VECTOR_GC_PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+        scanned += len(page["ids"])
+
+        candidates = {vector_id: row_id(vector_id, metadata) for vector_id, metadata in zip(page["ids"], page["metadatas"])}
+        wanted = {value for value in candidates.values() if value is not None}
+        existing = {row.id for row in db.query(model.id).filter(model.id.in_(wanted))} if wanted else set()
+        orphan_ids.extend(vector_id for vector_id, value in candidates.items() if value not in existing)
+    return scanned, orphan_ids
+
+
+def delete_ids(collection, ids: list):
+    for start in range(0, len(ids), chroma_service.CHROMA_DELETE_BATCH_SIZE):
+        collection.delete(ids=ids[start:start + chroma_service.CHROMA_DELETE_BATCH_SIZE])
+
+
+def classify_collections() -> dict:
+    """
+    Sort the collections on disk. Live partitions (any backend) are never dropped;
+    legacy generations are droppable only once migrate_vectors.py has marked them
+    migrated; anything unrecognised is only dropped when named explicitly.
+    """
+    groups = {"live": [], "droppable": [], "unmigrated_legacy": [], "unknown": []}
+    for collection in chroma_service.client.list_collections():
+        if chroma_service.is_live_collection(collection.name):
+            groups["live"].append(collection.name)
+        elif collection.name in chroma_service.LEGACY_COLLECTIONS:
+            migrated = (collection.metadata or {}).get(chroma_service.MIGRATED_MARKER)
+            groups["droppable" if migrated else "unmigrated_legacy"].append(collection.name)
+        else:
+            groups["unknown"].append(collection.name)
+    return {group: sorted(names) for group, names in groups.items()}
+
+
+def _collections_to_drop(groups: dict, drop_unused: bool, drop_names: list) -> list:
+    names = list(groups["droppable"]) if drop_unused else []
+    on_disk = {name for group in groups.values() for name in group}
+    for name in drop_names or []:
+        if name not in on_disk:
+            raise ValueError(f"Collection {name!r} does not exist")
+        if name in groups["live"]:
+            raise ValueError(f"Collection {name!r} holds live vectors and can't be dropped")
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def _chroma_sqlite_path() -> str:
+    return str(Path(chroma_service.CHROMA_DB_PATH) / "chroma.sqlite3")
+
+
+def orphan_segment_dirs() -> list:
+    """
+    HNSW segment directories with no segment row left in chroma.sqlite3. Chroma
+    does not always remove them when a collection is dropped.
+    """
+    conn = sqlite3.connect(f"file:{_chroma_sqlite_path()}?mode=ro", uri=True)
+    try:
+        live = {row[0] for row in conn.execute("SELECT id FROM segments")}
+    finally:
+        conn.close()
+    orphans = []
+    for path in Path(chroma_service.CHROMA_DB_PATH).iterdir():
+        try:
+            uuid.UUID(path.name)
+        except ValueError:
+            continue
+        if path.is_dir() and path.name not in live:
+            orphans.append(path)
+    return sorted(orphans)
+
+
+def _vacuum_sqlite():
+    # Deleted rows only go to SQLite's freelist; VACUUM returns the pages to the filesystem
+    conn = sqlite3.connect(_chroma_sqlite_path())
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def collect_garbage(db: Session, dry_run: bool = True, drop_unused: bool = False, vacuum: bool = False,
+                    drop_names: list = None) -> dict:
+    """
+    Reconcile Chroma against Postgres: delete chat vectors whose ChatMessage is gone
+    and resume chunks whose Resume is gone, optionally drop migrated legacy collections
+    (drop_unused) and explicitly named non-live ones (drop_names), remove segment
+    directories nothing references and (with vacuum) compact chroma.sqlite3.
+    Reports what was (or, with dry_run, would be) removed and the disk space reclaimed.
+    Raises ValueError, before touching anything, if drop_names includes a live or missing collection.
+    """
+    groups = classify_collections()
+    to_drop = _collections_to_drop(groups, drop_unused, drop_names)
+    disk_before = _disk_usage(chroma_service.CHROMA_DB_PATH)
+    report = {"dry_run": dry_run, "collections": {}}
+
+    # Every per-user partition is reconciled on its own
+    targets = [
+        (collection, models.ChatMessage, _chat_row_id) for collection in chroma_service.chat_collections.collections()
+    ] + [
+        (collection, models.Resume, _resume_row_id) for collection in chroma_service.resume_collections.collections()
+    ]
+    for collection, model, row_id in targets:
+        scanned, orphan_ids = find_orphans(db, collection, model, row_id)
+        if not dry_run:
+            delete_ids(collection, orphan_ids)
+        report["collections"][collection.name] = {
+            "scanned": scanned,
+            "orphans": len(orphan_ids),
+            "deleted": 0 if dry_run else len(orphan_ids),
+        }
+
+    report["droppable_collections"] = groups["droppable"]
+    report["unmigrated_legacy_collections"] = groups["unmigrated_legacy"]
+    report["unknown_collections"] = groups["unknown"]
+    report["collections_to_drop"] = to_drop
+    report["dropped_collections"] = []
+    if not dry_run:
+        for name in to_drop:
+            chroma_service.client.delete_collection(name)
+            chroma_service.chat_collections.forget(name)
+            chroma_service.resume_collections.forget(name)
+            report["dropped_collections"].append(name)
+
+    segment_dirs = orphan_segment_dirs()
+    report["orphan_segment_dirs"] = [path.name for path in segment_dirs]
+    if not dry_run:
+        for path in segment_dirs:
+            shutil.rmtree(path, ignore_errors=True)
+        if vacuum:
+            _vacuum_sqlite()
+
+    disk_after = _disk_usage(chroma_service.CHROMA_DB_PATH)
+    report.update({
+        "disk_bytes_before": disk_before,
+        "disk_bytes_after": disk_after,
+        "reclaimed_bytes": max(disk_before - disk_after, 0),
+    })
+    return report
@@ -0,0 +1,103 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from chromadb.errors import NotFoundError
+
+# 0 = one collection per user; N > 0 = users hashed into N bucket collections
+CHROMA_PARTITION_BUCKETS = int(os.getenv("CHROMA_PARTITION_BUCKETS", "0"))
+# Collection handles kept open; older ones are dropped and re-fetched on demand
+CHROMA_MAX_OPEN_COLLECTIONS = int(os.getenv("CHROMA_MAX_OPEN_COLLECTIONS", "256"))
+
+
+class PartitionedCollection:
+    """
+    A logical collection split into one Chroma collection per tenant (or per hash
+    bucket of tenants), so a query only searches that user's vectors instead of
+    filtering a global index. Handles are created lazily and kept in an LRU.
+    """
+
+    def __init__(self, client, base_name: str, embedding_function,
+                 buckets: int = CHROMA_PARTITION_BUCKETS, max_open: int = CHROMA_MAX_OPEN_COLLECTIONS):
+        self.client = client
+        self.base_name = base_name
+        self.embedding_function = embedding_function
+        self.buckets = buckets
+        self.max_open = max(1, max_open)
+        self._handles = OrderedDict()  # collection name -> handle
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.opens = 0
+        self.evictions = 0
+
+    def partition_name(self, user_id) -> str:
+        if self.buckets > 0:
+            bucket = zlib.crc32(str(user_id).encode("utf-8")) % self.buckets
+            return f"{self.base_name}_b{bucket}"
+        return f"{self.base_name}_u{user_id}"
+
+    def user_filter(self, user_id):
+        """Metadata filter still needed inside a partition: only buckets are shared."""
+        return {"user_id": str(user_id)} if self.buckets > 0 else None
+
+    def owns(self, collection_name: str) -> bool:
+        return collection_name.startswith(f"{self.base_name}_")
+
+    def _cached(self, name: str):
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is not None:
+                self._handles.move_to_end(name)
+                self.hits += 1
+            return handle
+
+    def _remember(self, name: str, handle):
+        with self._lock:
+            self.opens += 1
+            self._handles[name] = handle
+            self._handles.move_to_end(name)
+            while len(self._handles) > self.max_open:
+                self._handles.popitem(last=False)
+                self.evictions += 1
+        return handle
+
+    def for_user(self, user_id, create: bool = True):
+        """
+        Collection holding `user_id`'s vectors. With create=False returns None when the
+        user has never written anything, so reads don't create empty collections.
+        """
+        name = self.partition_name(user_id)
+        handle = self._cached(name)
+        if handle is not None:
+            return handle
+        if create:
+            handle = self.client.get_or_create_collection(name=name, embedding_function=self.embedding_function)
+        else:
+            try:
+                handle = self.client.get_collection(name=name, embedding_function=self.embedding_function)
+            except NotFoundError:
+                return None
+        return self._remember(name, handle)
+
+    def forget(self, name: str):
+        with self._lock:
+            self._handles.pop(name, None)
+
+    def collections(self) -> list:
+        """Every partition currently on disk (used by maintenance jobs)."""
+        return [
+            self.client.get_collection(name=c.name, embedding_function=self.embedding_function)
+            for c in self.client.list_collections() if self.owns(c.name)
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "base_name": self.base_name,
+                "buckets": self.buckets,
+                "open_handles": len(self._handles),
+                "max_open": self.max_open,
+                "hits": self.hits,
+                "opens": self.opens,
+                "evictions": self.evictions,
+            }
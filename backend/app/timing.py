@@ -0,0 +1,38 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from fastapi import Request
+
+# Per-request list of (stage, milliseconds); None outside a request
+_stages = contextvars.ContextVar("request_stages", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block and report it in the response's Server-Timing header."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = _stages.get()
+        if stages is not None:
+            stages.append((name, (time.perf_counter() - started) * 1000))
+
+
+async def server_timing_middleware(request: Request, call_next):
+    """
+    Collect stage() timings for the request and expose them as
+    `Server-Timing: context;dur=12.3, llm;dur=801.0, total;dur=815.2`.
+    Streaming responses only carry the stages finished before the body starts.
+    """
+    stages = []
+    token = _stages.set(stages)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _stages.reset(token)
+    entries = [f"{name};dur={ms:.1f}" for name, ms in stages]
+    entries.append(f"total;dur={(time.perf_counter() - started) * 1000:.1f}")
+    response.headers["Server-Timing"] = ", ".join(entries)
+    return response
@@ -0,0 +1,240 @@
+"""
+Query-plan benchmark for the hot read paths the chat and resume endpoints run
+(backend/app/async_crud.py, plus the sync message paging still in crud.py).
+
+Seeds a large synthetic dataset into a *separate* database, runs the real
+crud functions on the app's async engine, captures the SQL they emit and checks
+with EXPLAIN that every statement is served by an index (no full table scans,
+no extra sort).
+
+    python benchmark_queries.py                       # throwaway SQLite file
+    BENCHMARK_DATABASE_URL=postgresql://... python benchmark_queries.py --users 5000
+
+Never point BENCHMARK_DATABASE_URL at a real database: tables are dropped and recreated.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCHMARK_DATABASE_URL = os.getenv(
+    "BENCHMARK_DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.gettempdir(), 'career_mentor_benchmark.db')}"
+)
+# The app modules build their engine from DATABASE_URL at import time; keep it on the benchmark DB
+os.environ["DATABASE_URL"] = BENCHMARK_DATABASE_URL
+
+from sqlalchemy import create_engine, event, insert, text
+from backend.app import async_crud, crud, database, models
+
+INSERT_BATCH = 5000
+
+
+def seed(engine, users: int, sessions_per_user: int, messages_per_session: int, resumes_per_user: int):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+
+    def flush(conn, table, rows):
+        if rows:
+            conn.execute(insert(table), rows)
+            rows.clear()
+
+    with engine.begin() as conn:
+        rows = []
+        for user_id in range(1, users + 1):
+            rows.append({"id": user_id, "username": f"user{user_id}", "email": f"user{user_id}@example.com", "created_at": start})
+            if len(rows) >= INSERT_BATCH:
+                flush(conn, models.User.__table__, rows)
+        flush(conn, models.User.__table__, rows)
+
+        resume_id = 0
+        for user_id in range(1, users + 1):
+            for _ in range(resumes_per_user):
+                resume_id += 1
+                rows.append({
+                    "id": resume_id, "user_id": user_id, "file_path": f"data/resumes/{user_id}/{resume_id}.pdf",
+                    "parsed_content": "Synthetic resume text", "uploaded_at": start + timedelta(minutes=rng.randint(0, 500000))
+                })
+                if len(rows) >= INSERT_BATCH:
+                    flush(conn, models.Resume.__table__, rows)
+        flush(conn, models.Resume.__table__, rows)
+
+        for profile_id in range(1, resume_id + 1):
+            rows.append({
+                "id": profile_id, "resume_id": profile_id, "user_id": (profile_id - 1) // resumes_per_user + 1,
+                "skills": ["Python", "SQL"], "experience_level": "Mid", "years_experience": 3.0
+            })
+            if len(rows) >= INSERT_BATCH:
+                flush(conn, models.ResumeProfile.__table__, rows)
+        flush(conn, models.ResumeProfile.__table__, rows)
+
+        session_id = 0
+        message_rows = []
+        message_id = 0
+        for user_id in range(1, users + 1):
+            for number in range(1, sessions_per_user + 1):
+                session_id += 1
+                created = start + timedelta(days=number, minutes=rng.randint(0, 1000))
+                rows.append({
+                    "id": session_id, "user_id": user_id, "session_number": number, "created_at": created,
+                    "summary": f"Session {number}", "context_summary": "Synthetic rolling summary",
+                    # Half of each session is already folded into the rolling summary
+                    "summarized_through_id": message_id + messages_per_session // 2 or None
+                })
+                for i in range(messages_per_session):
+                    message_id += 1
+                    message_rows.append({
+                        "id": message_id, "session_id": session_id, "user_id": user_id,
+                        "role": "user" if i % 2 == 0 else "assistant",
+                        "content": f"Synthetic message {message_id}", "timestamp": created + timedelta(seconds=30 * i)
+                    })
+                    if len(message_rows) >= INSERT_BATCH:
+                        flush(conn, models.ChatSession.__table__, rows)
+                        flush(conn, models.ChatMessage.__table__, message_rows)
+        flush(conn, models.ChatSession.__table__, rows)
+        flush(conn, models.ChatMessage.__table__, message_rows)
+
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+    return {"users": users, "resumes": resume_id, "chat_sessions": session_id, "chat_messages": message_id}
+
+
+async def explain(conn, dialect: str, statement: str, parameters):
+    if dialect == "sqlite":
+        rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).fetchall()
+        details = [row[-1] for row in rows]
+        # A table access without an index shows up as "SCAN <table>" (no "USING ... INDEX"/primary key)
+        full_scans = [d for d in details if d.startswith("SCAN") and "USING" not in d]
+        sorts = [d for d in details if "TEMP B-TREE" in d]
+        return details, not full_scans and not sorts
+
+    rows = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)).fetchall()
+    plan = rows[0][0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    node_types = []
+
+    def walk(node):
+        node_types.append(node["Node Type"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return node_types, "Seq Scan" not in node_types and "Sort" not in node_types
+
+
+async def run(users: int, sessions_per_user: int, messages_per_session: int, repeat: int):
+    engine = database.async_engine
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+
+    def session_of(user_id):
+        return (user_id - 1) * sessions_per_user + 1
+
+    def watermark(session_id):
+        # Matches summarized_through_id as seeded
+        return (session_id - 1) * messages_per_session + messages_per_session // 2 or None
+
+    rng = random.Random(7)
+    probes = {
+        # Chat: the prompt's resume (with its profile), session list and rolling-summary memory
+        "get_latest_resume": lambda db, uid: async_crud.get_latest_resume(db, uid),
+        "get_resume_profile": lambda db, uid: async_crud.get_resume_profile(db, uid),
+        "get_chat_sessions": lambda db, uid: async_crud.get_chat_sessions(db, uid),
+        "get_unsummarized_chat_messages": lambda db, uid: async_crud.get_unsummarized_chat_messages(
+            db, session_of(uid), after_id=watermark(session_of(uid)), limit=16
+        ),
+        "get_unsummarized_backlog": lambda db, uid: async_crud.get_unsummarized_chat_messages(
+            db, session_of(uid), after_id=watermark(session_of(uid))
+        ),
+        "count_unsummarized_chat_messages": lambda db, uid: async_crud.count_unsummarized_chat_messages(
+            db, session_of(uid), after_id=watermark(session_of(uid))
+        ),
+        # Message paging is still served by the sync crud.py function
+        "get_chat_messages_page": lambda db, uid: db.run_sync(
+            lambda session: crud.get_chat_messages_page(session, session_of(uid), 20)
+        ),
+    }
+
+    results = []
+    all_indexed = True
+    for name, probe in probes.items():
+        timings = []
+        plan = None
+        indexed = True
+        for _ in range(repeat):
+            user_id = rng.randint(1, users)
+            captured.clear()
+            async with database.AsyncSessionLocal() as db:
+                started = time.perf_counter()
+                await probe(db, user_id)
+                timings.append((time.perf_counter() - started) * 1000)
+            if plan is None:
+                # Every statement the call emitted (e.g. the selectinload for Resume.profile)
+                plan = []
+                async with engine.connect() as conn:
+                    for statement, parameters in list(captured):
+                        details, statement_indexed = await explain(conn, engine.dialect.name, statement, parameters)
+                        plan.append(details)
+                        indexed = indexed and statement_indexed
+        timings.sort()
+        all_indexed = all_indexed and indexed
+        results.append({
+            "query": name,
+            "index_scan": indexed,
+            "p50_ms": round(timings[len(timings) // 2], 3),
+            "max_ms": round(timings[-1], 3),
+            "plan": plan,
+        })
+
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    await engine.dispose()
+    return results, all_indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic data and verify crud query plans use indexes.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--sessions-per-user", type=int, default=10)
+    parser.add_argument("--messages-per-session", type=int, default=20)
+    parser.add_argument("--resumes-per-user", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per query")
+    parser.add_argument("--output", help="optional path for a JSON report")
+    args = parser.parse_args()
+
+    engine = create_engine(BENCHMARK_DATABASE_URL)
+    print(f"Seeding {BENCHMARK_DATABASE_URL} ...")
+    started = time.perf_counter()
+    counts = seed(engine, args.users, args.sessions_per_user, args.messages_per_session, args.resumes_per_user)
+    print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+    results, all_indexed = asyncio.run(run(args.users, args.sessions_per_user, args.messages_per_session, args.repeat))
+    for result in results:
+        status = "INDEX" if result["index_scan"] else "FULL SCAN/SORT"
+        print(f"{result['query']:<34} {status:<15} p50={result['p50_ms']:.3f}ms max={result['max_ms']:.3f}ms")
+        print(f"    plan: {result['plan']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"database": engine.dialect.name, "counts": counts, "results": results}, f, indent=2)
+
+    if not all_indexed:
+        print("FAIL: at least one hot query is not served by an index.")
+        sys.exit(1)
+    print("OK: all hot queries use index scans.")
+
+
+if __name__ == "__main__":
+    main()
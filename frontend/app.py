@@ -182,6 +182,7 @@ def show_login_page():
                             user_data = res.json()
                             st.session_state.user = user_data
                             st.session_state.messages = []
+                            st.session_state.history_cache = {}
                             st.session_state.current_session_id = None
                             st.session_state.auth_page = None
                             st.success(f"Welcome back, {user_data['username']}!")
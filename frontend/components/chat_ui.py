@@ -1,28 +1,91 @@
 import streamlit as st
 import requests
+import json
 import os
 
 API_URL =os.getenv("BACKEND_URL", "http://localhost:8000")
+# Messages per /chat/history request; older pages load on demand
+HISTORY_PAGE_SIZE = 50
+
+def stream_reply(payload: dict):
+    """Yield the mentor's reply chunk by chunk from the SSE endpoint."""
+    try:
+        with requests.post(f"{API_URL}/chat/messages/stream", json=payload, stream=True) as response:
+            if response.status_code != 200:
+                yield "Error: Failed to get response from server."
+                return
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                if event["type"] == "token":
+                    yield event["content"]
+                elif event["type"] == "error":
+                    yield f"Error: {event.get('detail', 'No response content')}"
+    except Exception as e:
+        yield f"Error: {e}"
+
+def _fetch_history(session_id: int, **params) -> list:
+    res = requests.get(f"{API_URL}/chat/history/{session_id}", params={"limit": HISTORY_PAGE_SIZE, **params})
+    res.raise_for_status()
+    return [{"id": m["id"], "role": m["role"], "content": m["content"]} for m in res.json()]
+
+def sync_history(session_id: int) -> dict:
+    """
+    Return the cached history for a session, fetching only what is missing:
+    the newest page on first load, then just the messages after the last cached id.
+    """
+    cache = st.session_state.setdefault("history_cache", {})
+    entry = cache.get(session_id)
+    if entry is None:
+        page = _fetch_history(session_id)
+        entry = {"messages": page, "has_older": len(page) == HISTORY_PAGE_SIZE}
+        cache[session_id] = entry
+        return entry
+    
+    while True:
+        after_id = entry["messages"][-1]["id"] if entry["messages"] else 0
+        page = _fetch_history(session_id, after_id=after_id)
+        entry["messages"].extend(page)
+        if len(page) < HISTORY_PAGE_SIZE:
+            return entry
+
+def load_older(session_id: int) -> dict:
+    """Prepend the page just before the oldest cached message."""
+    entry = st.session_state["history_cache"][session_id]
+    page = _fetch_history(session_id, before_id=entry["messages"][0]["id"])
+    entry["messages"][:0] = page
+    entry["has_older"] = len(page) == HISTORY_PAGE_SIZE
+    return entry
+
+def _display_messages(entry: dict) -> list:
+    return [{"role": m["role"], "content": m["content"]} for m in entry["messages"]]
 
 def render_chat(user_id: int):
     st.header("💬 Chat with your Mentor")
     
     current_session = st.session_state.get("current_session_id", None)
     
-    # Initialize chat history or fetch from backend
+    # Initialize chat history or sync it from backend (only messages we don't have yet)
     if "messages" not in st.session_state or st.session_state.get("last_loaded_session") != current_session:
         st.session_state.messages = []
         st.session_state.last_loaded_session = current_session
         
         if current_session:
             try:
-                res = requests.get(f"{API_URL}/chat/history/{current_session}")
-                if res.status_code == 200:
-                    history = res.json()
-                    for msg in history:
-                        st.session_state.messages.append({"role": msg["role"], "content": msg["content"]})
+                st.session_state.messages = _display_messages(sync_history(current_session))
             except Exception as e:
                 st.error(f"Failed to load chat history: {e}")
+    
+    entry = st.session_state.get("history_cache", {}).get(current_session)
+    if entry and entry["has_older"]:
+        if st.button("⬆️ Load earlier messages"):
+            try:
+                load_older(current_session)
+                st.session_state.messages = _display_messages(entry)
+            except Exception as e:
+                st.error(f"Failed to load earlier messages: {e}")
         
     # Input at the top
     with st.form(key="chat_form", clear_on_submit=True):
@@ -62,18 +125,20 @@ def render_chat(user_id: int):
             "content": prompt
         }
         
-        try:
-            with st.spinner("Thinking..."):
-                response = requests.post(f"{API_URL}/chat/messages/", json=payload)
-                if response.status_code == 200:
-                    ai_message = response.json()
-                    response_text = ai_message.get("content", "Error: No response content")
-                else:
-                    response_text = "Error: Failed to get response from server."
-        except Exception as e:
-            response_text = f"Error: {e}"
+        # Show the conversation so far, then render the reply as it streams in
+        for message in st.session_state.messages:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+        
+        with st.chat_message("assistant"):
+            response_text = st.write_stream(stream_reply(payload)) or "Error: No response content"
 
         st.session_state.messages.append({"role": "assistant", "content": response_text})
+        # Pull the two persisted messages into the cache so the next switch back is a no-op
+        try:
+            sync_history(session_id)
+        except Exception:
+            pass
         st.rerun()
 
     # Display chat messages from history
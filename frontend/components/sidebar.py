@@ -1,9 +1,23 @@
 import streamlit as st
 import requests
 import os
+import time
 
 API_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
 
+def wait_for_ingestion(job_id: int, timeout_seconds: float = 120, poll_interval: float = 1.0) -> dict:
+    """Poll the resume ingestion job until it finishes (or the timeout passes)."""
+    deadline = time.time() + timeout_seconds
+    job = {}
+    while time.time() < deadline:
+        res = requests.get(f"{API_URL}/resumes/jobs/{job_id}")
+        if res.status_code == 200:
+            job = res.json()
+            if job["status"] in ("completed", "failed"):
+                break
+        time.sleep(poll_interval)
+    return job
+
 def render_sidebar(user_id: int):
     with st.sidebar:
         st.title("🎯 AI Career Mentor")
@@ -69,8 +83,14 @@ def render_sidebar(user_id: int):
                             url += f"?session_id={current_session_id}"
                             
                         res = requests.post(url, files={"file": (uploaded_file.name, uploaded_file.getvalue())})
-                        if res.status_code == 200:
-                            st.success("Resume uploaded and analyzed!")
+                        if res.status_code == 202:
+                            job = wait_for_ingestion(res.json()["id"])
+                            if job.get("status") == "completed":
+                                st.success("Resume uploaded and analyzed!")
+                            elif job.get("status") == "failed":
+                                st.error(f"Failed to analyze resume: {job.get('error')}")
+                            else:
+                                st.info("Resume uploaded. Analysis is still running in the background.")
                         else:
                             st.error("Failed to upload resume.")
                     except Exception as e:
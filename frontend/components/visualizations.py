@@ -42,3 +42,16 @@ def render_visualizations(user_id: int):
         else:
             st.warning("No skills detected yet.")
 
+    # Skill growth over time (one point per analyzed resume)
+    try:
+        response = requests.get(f"{API_URL}/progress/{user_id}")
+        history = response.json() if response.status_code == 200 else []
+    except Exception:
+        history = []
+    
+    if history and len({entry["resume_id"] for entry in history}) > 1:
+        st.subheader("Skill Growth Over Time")
+        df_history = pd.DataFrame(history)
+        df_history["Date"] = pd.to_datetime(df_history["Date"])
+        fig_line = px.line(df_history, x="Date", y="Score", color="Skill", markers=True, title="Proficiency by Resume Upload")
+        st.plotly_chart(fig_line, use_container_width=True)
@@ -0,0 +1,69 @@
+"""
+Vector store garbage collection.
+
+Deletes Chroma entries whose Postgres row is gone (chat vectors without a
+ChatMessage, resume chunks without a Resume) and can drop collections the app
+no longer uses. --drop-unused only drops legacy v4 collections that
+migrate_vectors.py has copied (and marked); live partitions of every embedding
+backend are never dropped, and anything else must be named with --drop.
+Segment directories left behind by
+dropped collections are removed as well. Reports what was removed and the disk
+space reclaimed under data/chroma_db.
+
+    python gc_vectors.py                        # dry run: report only
+    python gc_vectors.py --apply                # delete orphaned vectors
+    python gc_vectors.py --apply --drop-unused  # ...and drop migrated legacy collections
+    python gc_vectors.py --apply --drop NAME    # ...and drop a named, non-live collection
+    python gc_vectors.py --apply --vacuum       # ...and compact chroma.sqlite3
+
+Chroma's local store is not safe for concurrent writers: stop the API first,
+or use POST /maintenance/vector-gc on the running server instead.
+"""
+import argparse
+import json
+
+from backend.app.database import SessionLocal
+from backend.app.services import vector_gc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile Chroma vectors against the database and delete orphans.")
+    parser.add_argument("--apply", action="store_true", help="actually delete (default is a dry run)")
+    parser.add_argument("--drop-unused", action="store_true", help="also drop legacy collections already migrated")
+    parser.add_argument("--drop", action="append", metavar="NAME", help="also drop this non-live collection (repeatable)")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM chroma.sqlite3 to return freed pages to disk")
+    parser.add_argument("--output", help="optional path for a JSON report")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = vector_gc.collect_garbage(db, dry_run=not args.apply, drop_unused=args.drop_unused,
+                                           vacuum=args.vacuum, drop_names=args.drop)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        db.close()
+
+    for name, stats in report["collections"].items():
+        print(f"{name:<30} scanned={stats['scanned']} orphans={stats['orphans']} deleted={stats['deleted']}")
+    print(f"Migrated legacy collections (droppable): {', '.join(report['droppable_collections']) or 'none'}")
+    if report["unmigrated_legacy_collections"]:
+        print(f"Legacy collections NOT migrated yet (run migrate_vectors.py first): "
+              f"{', '.join(report['unmigrated_legacy_collections'])}")
+    if report["unknown_collections"]:
+        print(f"Unrecognised collections (drop only with --drop NAME): {', '.join(report['unknown_collections'])}")
+    print(f"To drop: {', '.join(report['collections_to_drop']) or 'none'}")
+    if report["dropped_collections"]:
+        print(f"Dropped: {', '.join(report['dropped_collections'])}")
+    print(f"Orphaned segment directories: {len(report['orphan_segment_dirs'])}")
+    print(f"Disk: {report['disk_bytes_before']} -> {report['disk_bytes_after']} bytes (reclaimed {report['reclaimed_bytes']})")
+    if report["dry_run"]:
+        print("Dry run: nothing was deleted. Re-run with --apply.")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+End-to-end load test for the FastAPI backend.
+
+Starts one uvicorn worker in a subprocess with the local stand-ins
+(LLM_PROVIDER=fake, EMBEDDING_BACKEND=local) and throwaway database, Chroma,
+embedding-cache and resume directories. Then N virtual users register, log in,
+open a chat session and run a weighted mix of actions against the real
+endpoints. Reports throughput and p50/p95/p99 latency per endpoint, plus per
+server stage from the Server-Timing header, and writes it all to a JSON file
+so runs can be compared.
+
+    python load_test.py                                   # 20 users x 10 actions
+    python load_test.py --users 50 --actions 40 --mix chat=5,stream=2,upload=1,roadmap=1,analytics=1
+    python load_test.py --llm-error-rate 0.2              # exercise LLM retries / circuit breaker
+    python load_test.py --url http://localhost:8000       # drive an already running server
+
+With --url nothing is started; the target's own LLM/embedding settings apply.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+
+# Action names map to VirtualUser methods
+ACTIONS = ("chat", "stream", "history", "upload", "roadmap", "analytics", "new_session")
+DEFAULT_MIX = "chat=6,stream=2,history=2,upload=1,roadmap=1,analytics=1,new_session=1"
+INGESTION_POLL_SECONDS = 0.05
+INGESTION_TIMEOUT_SECONDS = 60
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "max_ms": round(samples[-1], 2) if samples else 0.0,
+    }
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ACTIONS:
+            raise SystemExit(f"Unknown action {name!r}; choose from {', '.join(ACTIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # endpoint -> [ms]
+        self.stages = defaultdict(list)     # "endpoint:stage" -> [ms]
+        self.errors = defaultdict(int)      # endpoint -> count
+
+    def record(self, endpoint: str, started: float, response: httpx.Response = None, ok: bool = True):
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        if not ok or response is None or response.status_code >= 400:
+            self.errors[endpoint] += 1
+        if response is not None:
+            for entry in response.headers.get("server-timing", "").split(","):
+                name, _, duration = entry.strip().partition(";dur=")
+                if name and duration and name != "total":
+                    self.stages[f"{endpoint}:{name}"].append(float(duration))
+
+    def report(self, elapsed: float) -> dict:
+        return {
+            "endpoints": {
+                name: {**summarize(values, elapsed), "errors": self.errors.get(name, 0)}
+                for name, values in sorted(self.latencies.items())
+            },
+            "stages": {name: summarize(values, elapsed) for name, values in sorted(self.stages.items())},
+        }
+
+
+class VirtualUser:
+    def __init__(self, index: int, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, run_id: str):
+        self.index = index
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.username = f"load-{run_id}-{index}"
+        self.user_id = None
+        self.session_id = None
+        self.uploads = 0
+
+    async def call(self, endpoint: str, method: str, path: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(endpoint, started, ok=False)
+            return None
+        self.recorder.record(endpoint, started, response)
+        return response
+
+    async def setup(self):
+        password = "load-test-password"
+        response = await self.call("register", "POST", "/auth/register", json={
+            "username": self.username, "email": f"{self.username}@example.com", "password": password
+        })
+        await self.call("login", "POST", "/auth/login", json={"username": self.username, "password": password})
+        self.user_id = response.json()["id"]
+        await self.new_session()
+        # Every user starts with a resume so roadmap/analytics have something to work on
+        await self.upload()
+
+    async def new_session(self):
+        response = await self.call("create_session", "POST", "/chat/sessions/", json={"user_id": self.user_id, "summary": "Load test"})
+        if response is not None and response.status_code == 200:
+            self.session_id = response.json()["id"]
+
+    def _message(self) -> dict:
+        question = self.rng.choice([
+            "How do I move into a senior backend role?",
+            "Which skills should I learn next for data engineering?",
+            "Can you review the projects section of my resume?",
+            "What salary range should I expect as a mid-level developer?",
+            "How should I prepare for system design interviews?",
+        ])
+        return {"session_id": self.session_id, "user_id": self.user_id, "role": "user", "content": question}
+
+    async def chat(self):
+        await self.call("chat", "POST", "/chat/messages/", json=self._message())
+
+    async def stream(self):
+        started = time.perf_counter()
+        first_token = None
+        try:
+            async with self.client.stream("POST", "/chat/messages/stream", json=self._message()) as response:
+                async for line in response.aiter_lines():
+                    if first_token is None and line.startswith("data: "):
+                        first_token = time.perf_counter()
+                        self.recorder.latencies["stream:first_token"].append((first_token - started) * 1000)
+            self.recorder.record("stream", started, response)
+        except httpx.HTTPError:
+            self.recorder.record("stream", started, ok=False)
+
+    async def history(self):
+        await self.call("history", "GET", f"/chat/history/{self.session_id}")
+
+    async def upload(self):
+        self.uploads += 1
+        resume = (
+            f"{self.username} resume {self.uploads}\n"
+            "Summary\nBackend developer focused on APIs and data pipelines.\n"
+            "Experience\nBuilt FastAPI services, PostgreSQL schemas and background workers.\n"
+            f"Skills\nPython, SQL, Docker, {self.rng.choice(['Kafka', 'Spark', 'Airflow', 'Redis'])}\n"
+            "Education\nBSc Computer Science\n"
+        )
+        started = time.perf_counter()
+        response = await self.call(
+            "upload", "POST", f"/resumes/upload/{self.user_id}", params={"session_id": self.session_id},
+            files={"file": (f"resume-{self.uploads}.txt", resume.encode("utf-8"), "text/plain")}
+        )
+        if response is None or response.status_code != 202:
+            return
+        # Ingestion runs in the background; measure upload -> job completed as its own pipeline entry
+        job = response.json()
+        deadline = time.perf_counter() + INGESTION_TIMEOUT_SECONDS
+        while job["status"] not in ("completed", "failed") and time.perf_counter() < deadline:
+            await asyncio.sleep(INGESTION_POLL_SECONDS)
+            polled = await self.client.get(f"/resumes/jobs/{job['id']}")
+            job = polled.json()
+        self.recorder.latencies["ingestion:end_to_end"].append((time.perf_counter() - started) * 1000)
+        if job["status"] != "completed":
+            self.recorder.errors["ingestion:end_to_end"] += 1
+
+    async def roadmap(self):
+        await self.call("roadmap", "GET", f"/roadmap/{self.user_id}")
+
+    async def analytics(self):
+        await self.call("analytics", "GET", f"/analytics/{self.user_id}")
+
+    async def run(self, mix: dict, actions: int):
+        await self.setup()
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        for _ in range(actions):
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, port: int, extra_env: dict) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "CHROMA_DB_PATH": os.path.join(workdir, "chroma_db"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+        "RESUMES_DIR": os.path.join(workdir, "resumes"),
+        "LLM_PROVIDER": "fake",
+        "EMBEDDING_BACKEND": "local",
+        **extra_env,
+    }
+    env.pop("ASYNC_DATABASE_URL", None)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--log-level", "warning"],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+
+
+async def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            if process is not None and process.poll() is not None:
+                raise SystemExit("Server exited during startup")
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"Server at {base_url} did not become ready in {timeout:.0f}s")
+
+
+async def run_load(base_url: str, users: int, actions: int, mix: dict, seed: int, concurrency: int) -> dict:
+    recorder = Recorder()
+    run_id = f"{seed}-{int(time.time())}"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        virtual_users = [VirtualUser(i, client, recorder, random.Random(f"{seed}:{i}"), run_id) for i in range(users)]
+        started = time.perf_counter()
+        results = await asyncio.gather(*(user.run(mix, actions) for user in virtual_users), return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        # Gateway counters (queue depth, retries, rejections, circuit state) for the run
+        llm_response = await client.get("/metrics/llm")
+        llm_stats = llm_response.json() if llm_response.status_code == 200 else None
+    failures = [repr(result) for result in results if isinstance(result, Exception)]
+    report = recorder.report(elapsed)
+    total = sum(len(values) for name, values in recorder.latencies.items() if ":" not in name)
+    report.update({
+        "elapsed_s": round(elapsed, 3),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "failed_users": failures,
+        "llm_gateway": llm_stats,
+    })
+    return report
+
+
+def print_report(report: dict):
+    print(f"\n{report['total_requests']} requests in {report['elapsed_s']}s ({report['throughput_rps']} req/s)")
+    header = f"{'endpoint':<28}{'count':>7}{'err':>5}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<28}{stats['count']:>7}{stats['errors']:>5}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    if report["stages"]:
+        print(f"\n{'server stage':<28}{'count':>7}{'':>5}{'':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for name, stats in report["stages"].items():
+            print(f"{name:<28}{stats['count']:>7}{'':>5}{'':>9}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    llm = report.get("llm_gateway")
+    if llm:
+        print(f"\nLLM gateway: peak in-flight {llm['peak_in_flight']}/{llm['max_concurrency']}, "
+              f"peak queue {llm['peak_queue_depth']}, retries {llm['retries']}, "
+              f"rejected {llm['rejected']}, circuit {llm['circuit']['state']}")
+    for failure in report["failed_users"]:
+        print(f"virtual user failed: {failure}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the backend with a configurable user mix and report latency percentiles.")
+    parser.add_argument("--url", help="target an already running server instead of starting one")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--actions", type=int, default=10, help="actions per user after setup")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted actions (default {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=100, help="max open HTTP connections")
+    parser.add_argument("--llm-latency-ms", type=float, help="median fake LLM latency (LLM_FAKE_LATENCY_MS)")
+    parser.add_argument("--llm-error-rate", type=float, help="fraction of fake LLM calls failing with 503 (LLM_FAKE_ERROR_RATE)")
+    parser.add_argument("--output", default="load_test_results.json", help="JSON report path")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    process = None
+    workdir = None
+    base_url = args.url
+    if base_url is None:
+        workdir = tempfile.mkdtemp(prefix="career-mentor-load-")
+        port = _free_port()
+        extra_env = {}
+        if args.llm_latency_ms is not None:
+            extra_env["LLM_FAKE_LATENCY_MS"] = str(args.llm_latency_ms)
+        if args.llm_error_rate is not None:
+            extra_env["LLM_FAKE_ERROR_RATE"] = str(args.llm_error_rate)
+        process = start_server(workdir, port, extra_env)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        asyncio.run(wait_until_ready(base_url, process))
+        print(f"Running {args.users} users x {args.actions} actions against {base_url} (mix: {args.mix})")
+        started_at = datetime.utcnow()
+        report = asyncio.run(run_load(base_url, args.users, args.actions, mix, args.seed, args.concurrency))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report["config"] = {
+        "url": args.url or "local uvicorn (1 worker, fake LLM, local embeddings)",
+        "users": args.users,
+        "actions": args.actions,
+        "mix": mix,
+        "seed": args.seed,
+        "llm_latency_ms": args.llm_latency_ms,
+        "llm_error_rate": args.llm_error_rate,
+        "started_at": started_at.isoformat(),
+        "workdir": workdir,
+    }
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if any(stats["errors"] for stats in report["endpoints"].values()) or report["failed_users"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -58,5 +58,113 @@ def migrate():
             conn.rollback()
             print(f"session_number backfill skipped: {e}")
 
+        # Migration 4: Roadmap cache columns
+        roadmap_columns = [
+            ("resume_id", "INTEGER REFERENCES resumes(id)"),
+            ("prompt_version", "VARCHAR"),
+            ("content", "JSON"),
+            ("refreshed_at", "TIMESTAMP"),
+        ]
+        for column, column_type in roadmap_columns:
+            try:
+                print(f"Attempting to add {column} column to roadmaps...")
+                conn.execute(text(f"ALTER TABLE roadmaps ADD COLUMN {column} {column_type}"))
+                conn.commit()
+                print(f"Migration successful: Added {column} to roadmaps.")
+            except Exception as e:
+                conn.rollback()
+                print(f"roadmaps.{column} migration skipped (may already exist): {e}")
+
+        # Migration 5: Link skill scores to the resume they were computed from
+        try:
+            print("Attempting to add resume_id column to progress_tracking...")
+            conn.execute(text("ALTER TABLE progress_tracking ADD COLUMN resume_id INTEGER REFERENCES resumes(id)"))
+            conn.commit()
+            print("Migration successful: Added resume_id to progress_tracking.")
+        except Exception as e:
+            conn.rollback()
+            print(f"progress_tracking.resume_id migration skipped (may already exist): {e}")
+
+        # Migration 6: Parser timings on resume ingestion jobs
+        try:
+            print("Attempting to add parse_stats column to ingestion_jobs...")
+            conn.execute(text("ALTER TABLE ingestion_jobs ADD COLUMN parse_stats JSON"))
+            conn.commit()
+            print("Migration successful: Added parse_stats to ingestion_jobs.")
+        except Exception as e:
+            conn.rollback()
+            print(f"ingestion_jobs.parse_stats migration skipped (may already exist): {e}")
+
+        # Migration 7: Content hashes for upload dedup
+        for table in ["resumes", "ingestion_jobs"]:
+            try:
+                print(f"Attempting to add content_hash column to {table}...")
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN content_hash VARCHAR(64)"))
+                conn.commit()
+                print(f"Migration successful: Added content_hash to {table}.")
+            except Exception as e:
+                conn.rollback()
+                print(f"{table}.content_hash migration skipped (may already exist): {e}")
+        try:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_resumes_content_hash ON resumes (content_hash)"))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"ix_resumes_content_hash creation skipped: {e}")
+
+        # Migration 8: Composite indexes for the hot query paths in crud.py
+        # (must match the Index(...) definitions in backend/app/models.py)
+        indexes = [
+            "CREATE INDEX IF NOT EXISTS ix_chat_sessions_user_id_session_number ON chat_sessions (user_id, session_number)",
+            "CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id_timestamp ON chat_messages (session_id, timestamp)",
+            "CREATE INDEX IF NOT EXISTS ix_chat_messages_user_id_timestamp ON chat_messages (user_id, timestamp)",
+            "CREATE INDEX IF NOT EXISTS ix_resumes_user_id_uploaded_at ON resumes (user_id, uploaded_at)",
+            "CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_user_id_content_hash ON ingestion_jobs (user_id, content_hash)",
+            "CREATE INDEX IF NOT EXISTS ix_progress_tracking_resume_id ON progress_tracking (resume_id)",
+            "CREATE INDEX IF NOT EXISTS ix_progress_tracking_user_id_date ON progress_tracking (user_id, date)",
+            "CREATE INDEX IF NOT EXISTS ix_roadmaps_user_id_resume_id_prompt_version ON roadmaps (user_id, resume_id, prompt_version)",
+            "CREATE INDEX IF NOT EXISTS ix_roadmap_steps_roadmap_id ON roadmap_steps (roadmap_id)",
+        ]
+        for statement in indexes:
+            index_name = statement.split()[5]
+            try:
+                print(f"Creating index {index_name}...")
+                conn.execute(text(statement))
+                conn.commit()
+                print(f"Migration successful: {index_name} is in place.")
+            except Exception as e:
+                conn.rollback()
+                print(f"{index_name} creation skipped: {e}")
+
+        # Migration 9: Keyset index for paginated / incremental chat history
+        try:
+            print("Creating index ix_chat_messages_session_id_id...")
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id_id ON chat_messages (session_id, id)"))
+            conn.commit()
+            print("Migration successful: ix_chat_messages_session_id_id is in place.")
+        except Exception as e:
+            conn.rollback()
+            print(f"ix_chat_messages_session_id_id creation skipped: {e}")
+        
+        # Migration 10: Rolling session summaries used to bound the chat prompt
+        try:
+            print("Attempting to add context_summary column to chat_sessions...")
+            conn.execute(text("ALTER TABLE chat_sessions ADD COLUMN context_summary TEXT"))
+            conn.commit()
+            print("Migration successful: Added context_summary to chat_sessions.")
+        except Exception as e:
+            conn.rollback()
+            print(f"context_summary migration skipped (may already exist): {e}")
+        
+        # Migration 10b: Watermark of the last message covered by context_summary
+        try:
+            print("Attempting to add summarized_through_id column to chat_sessions...")
+            conn.execute(text("ALTER TABLE chat_sessions ADD COLUMN summarized_through_id INTEGER"))
+            conn.commit()
+            print("Migration successful: Added summarized_through_id to chat_sessions.")
+        except Exception as e:
+            conn.rollback()
+            print(f"summarized_through_id migration skipped (may already exist): {e}")
+
 if __name__ == "__main__":
     migrate()
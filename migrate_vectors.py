@@ -0,0 +1,24 @@
+"""
+One-off copy of the global v4 Chroma collections into the per-user partitions
+used since v5 (stored embeddings are reused, nothing is re-embedded).
+
+    python migrate_vectors.py
+
+Re-running is harmless (entries are upserted by id). Each fully copied v4
+collection is marked as migrated; only then does
+python gc_vectors.py --apply --drop-unused drop it.
+Stop the API while this runs; Chroma's local store is not safe for concurrent writers.
+"""
+from backend.app.services import chroma_service
+
+
+def main():
+    copied = chroma_service.migrate_legacy_collections()
+    if not copied:
+        print("No legacy collections found; nothing to migrate.")
+    for name, count in copied.items():
+        print(f"{name}: copied {count} vectors into per-user partitions")
+
+
+if __name__ == "__main__":
+    main()